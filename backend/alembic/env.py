@@ -15,8 +15,7 @@ from app.core.config import settings
 from app.core.database import Base
 
 # Import all models to register them with Base.metadata
-from app.models import User, Class, Subject, Grade, Absence, Event
-# from app.models.refresh_token import RefreshToken  # Will add in next migration
+from app.models import User, Class, Subject, Grade, Absence, Event, RefreshToken
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
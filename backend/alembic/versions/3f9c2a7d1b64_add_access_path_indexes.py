@@ -0,0 +1,53 @@
+"""Add indexes for the grades, absences, subjects, classes and events access paths
+
+Revision ID: 3f9c2a7d1b64
+Revises: 
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1b64'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, index name, columns); columns may be SQL expressions for DESC order
+INDEXES = [
+    ("grades", "ix_grades_student_subject", ["student_id", "subject_id"]),
+    ("grades", "ix_grades_subject_student", ["subject_id", "student_id"]),
+    ("absences", "ix_absences_student_date", ["student_id", sa.text("date DESC")]),
+    ("subjects", "ix_subjects_class_id", ["class_id"]),
+    ("classes", "ix_classes_teacher_id", ["teacher_id"]),
+    ("events", "ix_events_date", ["date"]),
+]
+
+
+def _existing_indexes(table: str) -> Optional[set]:
+    """Names of the indexes on ``table``, or None if the table does not exist yet"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases built by init_db() already have these indexes from the models,
+    # and tables it has not created yet will get them from there
+    for table, name, columns in INDEXES:
+        existing = _existing_indexes(table)
+        if existing is not None and name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, name, _ in reversed(INDEXES):
+        if name in (_existing_indexes(table) or ()):
+            op.drop_index(name, table_name=table)
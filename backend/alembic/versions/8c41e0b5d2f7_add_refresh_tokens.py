@@ -0,0 +1,55 @@
+"""Add the refresh_tokens lookup indexes
+
+Revision ID: 8c41e0b5d2f7
+Revises: 3f9c2a7d1b64
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41e0b5d2f7'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a7d1b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, columns, unique)
+INDEXES = [
+    ("ix_refresh_tokens_id", ["id"], False),
+    ("ix_refresh_tokens_token_hash", ["token_hash"], True),
+    ("ix_refresh_tokens_expires_at", ["expires_at"], False),
+    ("ix_refresh_tokens_user_revoked", ["user_id", "revoked"], False),
+]
+
+
+def _existing_indexes() -> Optional[set]:
+    """Names of the indexes on refresh_tokens, or None if the table does not exist yet"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("refresh_tokens"):
+        return None
+    return {index["name"] for index in inspector.get_indexes("refresh_tokens")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The table comes from init_db(), which runs after this on a fresh
+    # database (users does not exist yet either) and builds it with these
+    # indexes; only a table created before them needs them added
+    existing = _existing_indexes()
+    if existing is None:
+        return
+    for name, columns, unique in INDEXES:
+        if name not in existing:
+            op.create_index(name, "refresh_tokens", columns, unique=unique)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    existing = _existing_indexes() or ()
+    for name, _, _ in reversed(INDEXES):
+        if name in existing:
+            op.drop_index(name, table_name="refresh_tokens")
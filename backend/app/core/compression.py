@@ -0,0 +1,160 @@
+"""
+Response Compression
+Negotiated brotli/gzip compression of response bodies, streamed ones included
+"""
+import gzip
+import zlib
+from functools import lru_cache
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+# Already compressed, or not worth compressing
+EXCLUDED_CONTENT_TYPES = (
+    "application/pdf", "application/zip", "application/gzip", "application/x-gzip",
+    "application/octet-stream", "image/", "audio/", "video/", "font/woff",
+)
+
+
+@lru_cache(maxsize=1)
+def _brotli():
+    """The brotli module, or None when it is not installed (gzip only)"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """"br" or "gzip" per the Accept-Encoding header (server preference on ties), or None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    candidates = ("br", "gzip") if _brotli() is not None else ("gzip",)
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    """Incremental compressor; every chunk is flushed so streamed lines arrive promptly"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = _brotli().Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._brotli = None
+            # wbits 16+: gzip container instead of a raw zlib stream
+            self._zlib = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """One-shot compression of a complete response body"""
+    if encoding == "br":
+        return _brotli().compress(body, quality=settings.compression_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.compression_gzip_level, mtime=0)
+
+
+def _compressible(headers: Headers, status_code: int) -> bool:
+    if status_code < 200 or status_code in (204, 206, 304):
+        return False
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return bool(content_type) and not content_type.startswith(EXCLUDED_CONTENT_TYPES)
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses the client accepts compressed.
+
+    A complete body is compressed once it reaches ``COMPRESSION_MINIMUM_SIZE``;
+    a streamed body is compressed chunk by chunk. Bodies or chunks of at least
+    ``COMPRESSION_THREAD_THRESHOLD`` bytes are compressed in the threadpool, so
+    the event loop keeps serving other requests meanwhile.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def run(function, *args):
+            if len(args[0]) >= settings.compression_thread_threshold:
+                return await run_in_threadpool(function, *args)
+            return function(*args)
+
+        async def send_wrapper(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start = message
+                headers = Headers(raw=message["headers"])
+                passthrough = not _compressible(headers, message["status"])
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start)
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < settings.compression_minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The compressed bytes differ from the ones the tag names
+                    headers["ETag"] = f"W/{etag}"
+                if not more_body:
+                    body = await run(compress_body, body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                del headers["Content-Length"]
+                compressor = _Compressor(encoding)
+                await send(start)
+
+            chunk = await run(compressor.compress, body, not more_body)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
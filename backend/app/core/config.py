@@ -1,8 +1,9 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
-from typing import List
+from typing import List, Literal
 import os
 import sys
+import tempfile
 
 
 class Settings(BaseSettings):
@@ -40,6 +41,88 @@ class Settings(BaseSettings):
     # Environment
     environment: str = Field(default="development")
     
+    # Password hashing: bcrypt cost and the dedicated worker pool size;
+    # existing hashes with a different cost are upgraded on next login
+    bcrypt_rounds: int = Field(default=12, ge=4, le=31)
+    password_hash_workers: int = Field(default=2, ge=1)
+    password_hash_use_processes: bool = Field(default=False)
+    
+    # Report cards: rendered in a process pool and cached by content hash;
+    # an empty cache dir keeps rendered cards in memory only, otherwise the
+    # least recently used files beyond the disk entry limit are removed
+    report_render_workers: int = Field(default=2, ge=1)
+    report_card_cache_dir: str = Field(
+        default_factory=lambda: os.path.join(tempfile.gettempdir(), "pfc_report_cards")
+    )
+    report_card_cache_ttl: int = Field(default=3600, ge=0)
+    report_card_cache_entries: int = Field(default=256, ge=1)
+    report_card_cache_disk_entries: int = Field(default=5000, ge=1)
+    report_batch_dir: str = Field(
+        default_factory=lambda: os.path.join(tempfile.gettempdir(), "pfc_report_batches")
+    )
+    
+    # SQL statements per request: warn above the budget (0 disables), fail
+    # the request in strict mode, flag statements repeated this many times
+    sql_query_budget: int = Field(default=0, ge=0)
+    sql_query_budget_strict: bool = Field(default=False)
+    sql_repeat_threshold: int = Field(default=10, ge=2)
+    
+    # Metrics shared across gunicorn workers: each worker writes its values to
+    # a file in this directory and /metrics aggregates them; empty keeps
+    # metrics per process
+    metrics_multiproc_dir: str = Field(default="")
+    
+    # File holding the table version tokens behind conditional GETs, shared by
+    # every worker on the host; empty uses one per database in the temp dir
+    table_versions_path: str = Field(default="")
+    
+    # Schema creation: "startup" runs create_all once per process (once in the
+    # gunicorn master when the app is preloaded); "skip" only checks that the
+    # tables exist, as the Alembic revisions do not create them
+    schema_init: Literal["startup", "skip"] = Field(default="startup")
+    
+    # Background sampling of system and database metrics (seconds)
+    system_metrics_interval: float = Field(default=15.0, gt=0)
+    db_check_timeout: float = Field(default=2.0, gt=0)
+    # Readiness fails while a connection pool is at least this fraction in use
+    readiness_max_pool_usage: float = Field(default=0.9, gt=0, le=1)
+    
+    # Caching (seconds; 0 disables)
+    teacher_scope_cache_ttl: int = Field(default=60, ge=0)
+    dashboard_cache_ttl: int = Field(default=30, ge=0)
+    auth_user_cache_ttl: int = Field(default=60, ge=0)
+    
+    # Refresh token store: expired rows are purged every interval seconds
+    # (0 disables) in chunks; each worker remembers this many revoked tokens
+    refresh_token_purge_interval: float = Field(default=3600.0, ge=0)
+    refresh_token_purge_chunk_size: int = Field(default=1000, ge=1)
+    revoked_token_cache_size: int = Field(default=10000, ge=0)
+    
+    # Token-bucket rate limits ("<count>/<second|minute|hour|day>") per signed-in
+    # user, or client address when anonymous; login is limited per account.
+    # Buckets live in this SQLite file when set, shared by all workers of the
+    # host (gunicorn uses a temporary one when empty), else in process memory
+    rate_limit_default: str = Field(default="100/minute")
+    rate_limit_login: str = Field(default="5/minute")
+    rate_limit_login_ip: str = Field(default="300/minute")
+    rate_limit_storage: str = Field(default="")
+    
+    # Response compression (gzip, or brotli when installed): bodies smaller than
+    # the minimum size (bytes) are sent as they are; bodies or streamed chunks
+    # from the thread threshold up are compressed off the event loop
+    compression_minimum_size: int = Field(default=1024, ge=0)
+    compression_thread_threshold: int = Field(default=256 * 1024, ge=0)
+    compression_gzip_level: int = Field(default=6, ge=1, le=9)
+    compression_brotli_quality: int = Field(default=4, ge=0, le=11)
+    
+    # List endpoints encode rows directly with orjson (or MessagePack on
+    # request) instead of validating them against the response model
+    fast_list_serialization: bool = Field(default=True)
+    
+    # Build the current user from the access token's sub/role claims
+    # instead of looking it up; role changes then apply only to new tokens
+    auth_trust_token_claims: bool = Field(default=False)
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.monitoring import instrument_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +21,37 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers used by the async engine, keyed by database backend
+ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(database_url: str) -> URL:
+    """Swap the sync driver in a database URL for its async counterpart."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+# Async engine for the read-heavy routers; shares the sync engine's pool settings
+async_engine = create_async_engine(
+    to_async_url(settings.database_url),
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=10,
+    max_overflow=20,
+    echo=False
+)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -30,14 +64,21 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for getting an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Set once init_db() has run in this process, or in the gunicorn master it was forked from
+schema_verified = False
+
+
 def init_db():
     """Initialize database tables. Imports all models first."""
+    global schema_verified
     # Import all models to register them with Base.metadata
-    from app.models import User, Class, Subject, Grade, Absence, Event
-    try:
-        from app.models.refresh_token import RefreshToken
-    except ImportError:
-        logger.warning("RefreshToken model not found, skipping...")
+    from app.models import User, Class, Subject, Grade, Absence, Event, RefreshToken
     
     try:
         # Test connection (SQLAlchemy 2.0 syntax)
@@ -60,3 +101,39 @@ def init_db():
         logger.error(f"❌ Database table creation failed: {e}")
         print(f"❌ Database table creation failed: {e}")
         raise
+    schema_verified = True
+
+
+def verify_schema():
+    """Fail unless every model table exists; ``SCHEMA_INIT=skip`` creates none.
+
+    The Alembic revisions only add indexes to tables init_db() created, so a
+    new database needs one start with ``SCHEMA_INIT=startup``.
+    """
+    global schema_verified
+    # Registers every model table with Base.metadata
+    import app.models  # noqa: F401
+    
+    missing = sorted(set(Base.metadata.tables) - set(inspect(engine).get_table_names()))
+    if missing:
+        raise RuntimeError(
+            f"SCHEMA_INIT=skip but tables are missing: {', '.join(missing)}; "
+            "start once with SCHEMA_INIT=startup to create them"
+        )
+    schema_verified = True
+
+
+def ensure_schema():
+    """Create or check the schema unless this process already has (or inherited) a verified one."""
+    if schema_verified:
+        return
+    if settings.schema_init == "startup":
+        init_db()
+    else:
+        verify_schema()
+
+
+def dispose_inherited_pools():
+    """Drop pooled connections inherited across a fork without closing the parent's sockets."""
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
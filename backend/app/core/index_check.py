@@ -0,0 +1,91 @@
+"""
+Index usage check
+Records the SELECT statements the ORM issues and runs EXPLAIN on them to
+report tables read with a full scan instead of an index
+"""
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DIALECTS = ("sqlite", "mysql", "mariadb")
+
+
+class FullScan(NamedTuple):
+    """A table an EXPLAINed statement reads without using an index"""
+    table: str
+    statement: str
+
+
+@contextmanager
+def record_statements(engine: Engine) -> Iterator[List[Tuple[str, object]]]:
+    """Collect the (statement, parameters) of every SELECT run on ``engine``"""
+    statements: List[Tuple[str, object]] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
+def _sqlite_full_scans(conn: Connection, statement: str, parameters) -> List[str]:
+    # Plan rows read "SCAN <table>" for full scans, "SEARCH <table> USING ..."
+    # for index lookups and "SCAN <table> USING [COVERING] INDEX ..." for
+    # ordered index walks; an AUTOMATIC index is built by scanning the table
+    # on every execution; subqueries and constant rows are not tables
+    tables = []
+    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+        words = row[-1].split()
+        if len(words) < 2 or words[1].startswith("(") or words[1] == "CONSTANT":
+            continue
+        if (words[0] == "SCAN" and "USING" not in words) or "AUTOMATIC" in words:
+            tables.append(words[1])
+    return tables
+
+
+def _mysql_full_scans(conn: Connection, statement: str, parameters) -> List[str]:
+    result = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return [
+        row["table"] for row in result.mappings()
+        if row["type"] == "ALL" and row["table"] and not row["table"].startswith("<")
+    ]
+
+
+def explain_full_scans(conn: Connection, statement: str, parameters=()) -> List[str]:
+    """Return the tables ``statement`` reads with a full scan.
+
+    Raises ValueError on a dialect whose plans are not understood, rather than
+    reporting no scans for statements that were never checked.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        return _sqlite_full_scans(conn, statement, parameters)
+    if dialect in ("mysql", "mariadb"):
+        return _mysql_full_scans(conn, statement, parameters)
+    raise ValueError(
+        f"Cannot check query plans on the {dialect} dialect; supported: {', '.join(SUPPORTED_DIALECTS)}"
+    )
+
+
+def find_full_scans(engine: Engine, statements) -> List[FullScan]:
+    """EXPLAIN each recorded statement and list the full table scans"""
+    scans = []
+    seen = set()
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            for table in explain_full_scans(conn, statement, parameters):
+                scans.append(FullScan(table, statement))
+    for scan in scans:
+        logger.warning("Full scan of %s: %s", scan.table, " ".join(scan.statement.split()))
+    return scans
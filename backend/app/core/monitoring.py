@@ -4,63 +4,307 @@ Provides metrics, logging, and optional Sentry integration
 """
 import time
 import logging
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
 from datetime import datetime
 from typing import Optional
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import os
+import uuid
+from app.core.config import settings
+from app.core.shared_metrics import MetricValues, create_metric_values
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Metrics storage (in-memory for simplicity, use Redis/Prometheus in production)
-class MetricsStore:
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label for requests that matched no route, keeping label cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Health and metrics endpoints are not monitored, to avoid noise
+UNMONITORED_PATHS = frozenset({
+    "/health", "/health/live", "/health/ready", "/metrics", "/metrics/health", "/metrics/prometheus",
+})
+
+
+class LatencyHistogram:
+    """Fixed-bucket request latency histogram.
+    
+    Only observed from the event loop, so plain increments need no lock.
+    """
+    
+    __slots__ = ("counts", "sum", "count")
+    
     def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside the bucket it falls in"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                if index == len(LATENCY_BUCKETS):
+                    return lower
+                return lower + (LATENCY_BUCKETS[index] - lower) * (rank - seen) / n
+            seen += n
+        return LATENCY_BUCKETS[-1]
+    
+    def cumulative_counts(self):
+        """(upper bound, requests at or below it) pairs, ending with +Inf"""
+        total = 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            total += n
+            yield bound, total
+
+
+class MetricsStore:
+    """Request, SQL and password hashing metrics.
+    
+    Values live in a flat ``MetricValues`` store: in memory for a single
+    process, or in per-worker files when ``METRICS_MULTIPROC_DIR`` is set, in
+    which case every read aggregates all workers.
+    """
+    
+    def __init__(self, values: Optional[MetricValues] = None):
         self.start_time = time.time()
-        self.request_count = 0
-        self.request_duration_sum = 0.0
-        self.error_count = 0
-        self.endpoint_counts = {}
+        self.values = values if values is not None else MetricValues()
+        # (route template, method, status class) -> (bucket keys, sum key)
+        self._latency_keys = {}
+    
+    @property
+    def request_count(self) -> int:
+        return int(self.values.get("requests"))
+    
+    @property
+    def password_hash_jobs(self) -> int:
+        return int(self.values.get("password_hash_jobs"))
+    
+    @property
+    def password_hash_workers(self) -> int:
+        return int(self.values.get("gauge:password_hash_workers"))
+    
+    @password_hash_workers.setter
+    def password_hash_workers(self, workers: int):
+        self.values.set("gauge:password_hash_workers", workers)
         
-    def record_request(self, endpoint: str, duration: float, status_code: int):
-        """Record a request for metrics"""
-        self.request_count += 1
-        self.request_duration_sum += duration
+    def record_request(self, endpoint: str, duration: float, status_code: int, method: str = "GET"):
+        """Record a request for metrics; ``endpoint`` is the route template"""
+        values = self.values
+        values.inc("requests")
+        values.inc("request_seconds", duration)
         
         if status_code >= 400:
-            self.error_count += 1
-            
-        if endpoint not in self.endpoint_counts:
-            self.endpoint_counts[endpoint] = 0
-        self.endpoint_counts[endpoint] += 1
+            values.inc("errors")
+        
+        label = (endpoint, method, f"{status_code // 100}xx")
+        keys = self._latency_keys.get(label)
+        if keys is None:
+            prefix = "\t".join(label)
+            keys = self._latency_keys[label] = (
+                [f"latency\t{prefix}\t{index}" for index in range(len(LATENCY_BUCKETS) + 1)],
+                f"latency_sum\t{prefix}",
+            )
+        bucket_keys, sum_key = keys
+        values.inc(bucket_keys[bisect_left(LATENCY_BUCKETS, duration)])
+        values.inc(sum_key, duration)
+    
+    @staticmethod
+    def _latency_histograms(snapshot: dict) -> dict:
+        """Rebuild (route template, method, status class) -> LatencyHistogram"""
+        histograms = {}
+        for key, value in snapshot.items():
+            if key.startswith("latency\t"):
+                _, route, method, status_class, index = key.split("\t")
+                histogram = histograms.get((route, method, status_class))
+                if histogram is None:
+                    histogram = histograms[(route, method, status_class)] = LatencyHistogram()
+                histogram.counts[int(index)] += int(value)
+                histogram.count += int(value)
+            elif key.startswith("latency_sum\t"):
+                _, route, method, status_class = key.split("\t")
+                histogram = histograms.get((route, method, status_class))
+                if histogram is None:
+                    histogram = histograms[(route, method, status_class)] = LatencyHistogram()
+                histogram.sum += value
+        return histograms
+    
+    @staticmethod
+    def _route_query_stats(snapshot: dict) -> dict:
+        """route -> [requests, queries, db seconds, max queries in one request]"""
+        fields = {"query_requests": 0, "queries": 1, "query_seconds": 2, "max:queries": 3}
+        routes = {}
+        for key, value in snapshot.items():
+            name, _, route = key.partition("\t")
+            if name in fields and route:
+                totals = routes.get(route)
+                if totals is None:
+                    totals = routes[route] = [0, 0, 0.0, 0]
+                totals[fields[name]] = value if name == "query_seconds" else int(value)
+        return routes
+    
+    def get_route_latency_metrics(self, limit: int = 10, snapshot: Optional[dict] = None) -> dict:
+        """Get latency percentiles for the busiest routes, all methods and statuses merged"""
+        if snapshot is None:
+            snapshot = self.values.snapshot()
+        routes = {}
+        for (route, method, _), histogram in self._latency_histograms(snapshot).items():
+            merged = routes.get((method, route))
+            if merged is None:
+                merged = routes[(method, route)] = LatencyHistogram()
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.sum += histogram.sum
+            merged.count += histogram.count
+        busiest = sorted(routes.items(), key=lambda item: item[1].count, reverse=True)[:limit]
+        return {
+            f"{method} {route}": {
+                "requests": histogram.count,
+                "average_ms": round(histogram.sum / histogram.count * 1000, 2),
+                **{
+                    f"p{int(q * 100)}_ms": round(histogram.quantile(q) * 1000, 2)
+                    for q in (0.5, 0.95, 0.99)
+                },
+            }
+            for (method, route), histogram in busiest
+            if histogram.count
+        }
+    
+    def render_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.values.snapshot()
+        lines = [
+            "# HELP app_uptime_seconds Seconds since the application started.",
+            "# TYPE app_uptime_seconds gauge",
+            f"app_uptime_seconds {self.get_uptime():.3f}",
+            "# HELP http_request_duration_seconds Request latency by route template, method and status class.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (route, method, status_class), histogram in sorted(self._latency_histograms(snapshot).items()):
+            labels = f'route="{_escape_label(route)}",method="{method}",status="{status_class}"'
+            for bound, count in histogram.cumulative_counts():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+        lines += [
+            "# HELP db_queries_total SQL statements executed, by route template.",
+            "# TYPE db_queries_total counter",
+        ]
+        for route, (_, queries, _, _) in sorted(self._route_query_stats(snapshot).items()):
+            lines.append(f'db_queries_total{{route="{_escape_label(route)}"}} {queries}')
+        lines += [
+            "# HELP password_hash_in_flight Password hashing jobs queued or running.",
+            "# TYPE password_hash_in_flight gauge",
+            f"password_hash_in_flight {int(snapshot.get('gauge:password_hash_in_flight', 0))}",
+        ]
+        return "\n".join(lines) + "\n"
+    
+    def record_route_queries(self, route: str, stats: "QueryStats"):
+        """Record the SQL statements one request to ``route`` executed"""
+        values = self.values
+        values.inc(f"query_requests\t{route}")
+        values.inc(f"queries\t{route}", stats.count)
+        values.inc(f"query_seconds\t{route}", stats.duration)
+        values.set_max(f"max:queries\t{route}", stats.count)
+    
+    def get_route_query_metrics(self, limit: int = 10, snapshot: Optional[dict] = None) -> dict:
+        """Get per-route SQL statistics for the routes issuing the most queries"""
+        if snapshot is None:
+            snapshot = self.values.snapshot()
+        routes = sorted(
+            (item for item in self._route_query_stats(snapshot).items() if item[1][0]),
+            key=lambda item: item[1][1] / item[1][0],
+            reverse=True
+        )[:limit]
+        return {
+            route: {
+                "requests": requests,
+                "average_queries": round(queries / requests, 2),
+                "max_queries": max_queries,
+                "average_db_time_ms": round(db_time / requests * 1000, 2),
+            }
+            for route, (requests, queries, db_time, max_queries) in routes
+        }
+    
+    def record_password_hash_submitted(self):
+        """Count a password hashing job handed to the worker pool"""
+        self.values.inc("gauge:password_hash_in_flight")
+    
+    def record_password_hash_finished(self, wait: float):
+        """Record a finished password hashing job and how long it queued"""
+        values = self.values
+        values.inc("gauge:password_hash_in_flight", -1)
+        values.inc("password_hash_jobs")
+        values.inc("password_hash_wait_seconds", wait)
+        values.set_max("max:password_hash_wait", wait)
+    
+    def get_password_hash_metrics(self, snapshot: Optional[dict] = None) -> dict:
+        """Get password hashing pool metrics"""
+        if snapshot is None:
+            snapshot = self.values.snapshot()
+        workers = int(snapshot.get("gauge:password_hash_workers", 0))
+        in_flight = int(snapshot.get("gauge:password_hash_in_flight", 0))
+        jobs = int(snapshot.get("password_hash_jobs", 0))
+        return {
+            "workers": workers,
+            "in_flight": in_flight,
+            "queue_depth": max(in_flight - workers, 0),
+            "completed": jobs,
+            "average_wait_ms": round(
+                snapshot.get("password_hash_wait_seconds", 0.0) / max(jobs, 1) * 1000, 2
+            ),
+            "max_wait_ms": round(snapshot.get("max:password_hash_wait", 0.0) * 1000, 2),
+        }
     
     def get_uptime(self) -> float:
         """Get uptime in seconds"""
         return time.time() - self.start_time
     
-    def get_average_duration(self) -> float:
+    def get_average_duration(self, snapshot: Optional[dict] = None) -> float:
         """Get average request duration"""
-        if self.request_count == 0:
+        if snapshot is None:
+            snapshot = self.values.snapshot()
+        requests = snapshot.get("requests", 0)
+        if requests == 0:
             return 0.0
-        return self.request_duration_sum / self.request_count
+        return snapshot.get("request_seconds", 0.0) / requests
     
     def get_metrics(self) -> dict:
-        """Get all metrics"""
+        """Get all metrics, aggregated over every worker in multi-process mode"""
+        snapshot = self.values.snapshot()
         uptime = self.get_uptime()
+        requests = int(snapshot.get("requests", 0))
+        errors = int(snapshot.get("errors", 0))
+        endpoint_counts = Counter()
+        for (route, _, _), histogram in self._latency_histograms(snapshot).items():
+            endpoint_counts[route] += histogram.count
         return {
             "uptime_seconds": round(uptime, 2),
             "uptime_formatted": self._format_uptime(uptime),
-            "total_requests": self.request_count,
-            "total_errors": self.error_count,
-            "error_rate": round(self.error_count / max(self.request_count, 1) * 100, 2),
-            "average_response_time_ms": round(self.get_average_duration() * 1000, 2),
-            "requests_per_minute": round(self.request_count / max(uptime / 60, 1), 2),
-            "endpoint_counts": dict(sorted(
-                self.endpoint_counts.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )[:10]),  # Top 10 endpoints
+            "total_requests": requests,
+            "total_errors": errors,
+            "error_rate": round(errors / max(requests, 1) * 100, 2),
+            "average_response_time_ms": round(self.get_average_duration(snapshot) * 1000, 2),
+            "requests_per_minute": round(requests / max(uptime / 60, 1), 2),
+            "endpoint_counts": dict(endpoint_counts.most_common(10)),  # Top 10 endpoints
+            "password_hashing": self.get_password_hash_metrics(snapshot),
+            "database_queries": self.get_route_query_metrics(snapshot=snapshot),
+            "latency": self.get_route_latency_metrics(snapshot=snapshot),
             "timestamp": datetime.utcnow().isoformat(),
         }
     
@@ -84,66 +328,189 @@ class MetricsStore:
         return " ".join(parts)
 
 
+def _escape_label(value: str) -> str:
+    """Escape a Prometheus label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
 # Global metrics store
-metrics_store = MetricsStore()
+metrics_store = MetricsStore(create_metric_values(settings.metrics_multiproc_dir))
 
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    """Middleware for request/response logging and metrics collection"""
+class QueryBudgetExceeded(RuntimeError):
+    """Raised in strict mode when a request runs more SQL statements than allowed"""
+
+
+class QueryStats:
+    """SQL statements executed while serving one request"""
+    
+    __slots__ = ("count", "duration", "shapes")
+    
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+    
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement] += 1
+    
+    def repeated_statements(self, threshold: int) -> dict:
+        """Statements run at least ``threshold`` times, the signature of an N+1"""
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+
+# Stats of the request being served; None outside a monitored request
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is None:
+        return
+    started = getattr(context, "_query_started", None)
+    stats.record(statement, time.perf_counter() - started if started else 0.0)
+
+
+def instrument_engine(engine) -> None:
+    """Count the statements ``engine`` executes against the current request"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_template(scope: Scope) -> str:
+    """Matched route template (e.g. /api/grades/{grade_id}), else UNMATCHED_ROUTE"""
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+class MonitoringMiddleware:
+    """Pure ASGI middleware for request/response logging and metrics collection.
+    
+    Response bodies, streamed ones included, are passed through untouched;
+    headers are added to the ``http.response.start`` message and the request,
+    with every SQL statement its body ran, is recorded once the last body
+    chunk has been sent. Each request is logged as one DEBUG line; failures
+    are logged as errors.
+    """
     
     def __init__(self, app: ASGIApp, enable_logging: bool = True):
-        super().__init__(app)
+        self.app = app
         self.enable_logging = enable_logging
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
         # Skip monitoring for health/metrics endpoints to avoid noise
-        if request.url.path in ["/health", "/metrics"]:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in UNMONITORED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        method = scope["method"]
+        log = self.enable_logging and logger.isEnabledFor(logging.DEBUG)
+        query_stats = QueryStats()
+        stats_token = current_query_stats.set(query_stats)
+        status_code = 500
+        recorded = False
         
-        # Record start time
-        start_time = time.time()
+        def record(warn_budget: bool = True):
+            nonlocal recorded
+            recorded = True
+            duration = time.perf_counter() - start_time
+            metrics_store.record_request(_route_template(scope), duration, status_code, method)
+            _record_queries(scope, query_stats, warn_budget)
+            if log:
+                logger.debug(
+                    "%s %s → %d (%.2fms)", method, scope["path"], status_code, duration * 1000
+                )
         
-        # Log request
-        if self.enable_logging:
-            logger.info(f"→ {request.method} {request.url.path}")
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Response-Time", f"{(time.perf_counter() - start_time) * 1000:.2f}ms")
+                headers.append("X-Request-ID", uuid.uuid4().hex)
+                _report_queries(scope, headers, query_stats)
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                await send(message)
+                record()
+                return
+            await send(message)
         
-        # Process request
         try:
-            response: Response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Record metrics
-            metrics_store.record_request(
-                endpoint=request.url.path,
-                duration=duration,
-                status_code=response.status_code
-            )
-            
-            # Log response
-            if self.enable_logging:
-                logger.info(
-                    f"← {request.method} {request.url.path} "
-                    f"→ {response.status_code} ({duration*1000:.2f}ms)"
-                )
-            
-            # Add custom headers
-            response.headers["X-Response-Time"] = f"{duration*1000:.2f}ms"
-            response.headers["X-Request-ID"] = str(id(request))
-            
-            return response
-            
+            await self.app(scope, receive, send_wrapper)
+        except QueryBudgetExceeded:
+            # Raised before the response started, so the client gets a 500
+            if not recorded:
+                status_code = 500
+                record(warn_budget=False)
+            raise
         except Exception as e:
-            duration = time.time() - start_time
-            logger.error(f"✗ {request.method} {request.url.path} → Error: {str(e)}")
-            metrics_store.record_request(request.url.path, duration, 500)
+            logger.error("✗ %s %s → Error: %s", method, scope["path"], e)
+            if not recorded:
+                status_code = 500
+                record()
             raise
+        finally:
+            current_query_stats.reset(stats_token)
+
+
+def _over_budget(stats: QueryStats) -> bool:
+    budget = settings.sql_query_budget
+    return bool(budget) and stats.count > budget
+
+
+def _report_queries(scope: Scope, headers: MutableHeaders, stats: QueryStats):
+    """Expose the SQL statements run so far in headers; strict mode fails an over-budget request.
+
+    A streamed body may run more statements after this; ``_record_queries``
+    accounts for them once it has been sent.
+    """
+    headers.append("X-DB-Queries", str(stats.count))
+    headers.append("Server-Timing", f'db;dur={stats.duration*1000:.2f};desc="{stats.count} queries"')
+    
+    repeated = stats.repeated_statements(settings.sql_repeat_threshold)
+    if repeated:
+        headers.append("X-DB-Repeated-Queries", str(sum(repeated.values())))
+    
+    if settings.sql_query_budget_strict and _over_budget(stats):
+        raise QueryBudgetExceeded(_budget_message(scope, stats))
+
+
+def _record_queries(scope: Scope, stats: QueryStats, warn_budget: bool = True):
+    """Add a finished request's SQL statements to its route and warn about N+1s and the budget"""
+    route = _route_template(scope)
+    metrics_store.record_route_queries(route, stats)
+    
+    repeated = stats.repeated_statements(settings.sql_repeat_threshold)
+    if repeated:
+        logger.warning(
+            "Possible N+1 on %s %s: %s", scope["method"], route,
+            "; ".join(f"{n}x {shape[:120]}" for shape, n in repeated.items())
+        )
+    # Also covers strict mode when the statements ran after the headers were sent
+    if warn_budget and _over_budget(stats):
+        logger.warning(_budget_message(scope, stats))
+
+
+def _budget_message(scope: Scope, stats: QueryStats) -> str:
+    return (
+        f"{scope['method']} {_route_template(scope)} ran {stats.count} SQL statements "
+        f"(budget {settings.sql_query_budget})"
+    )
 
 
 # Optional Sentry integration
 sentry_sdk: Optional[object] = None
 
+
 def initialize_sentry(dsn: Optional[str] = None):
     """Initialize Sentry for error tracking"""
     global sentry_sdk
@@ -0,0 +1,39 @@
+"""
+Keyset Pagination Helpers
+Opaque cursors for id-ordered list endpoints
+"""
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last seen id as an opaque, URL-safe cursor."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor back into the last seen id."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+        if not isinstance(last_id, int) or last_id < 0:
+            raise ValueError(last_id)
+        return last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def resolve_after_id(cursor: Optional[str], after_id: Optional[int]) -> Optional[int]:
+    """Return the keyset position from either an opaque cursor or a raw after_id."""
+    if cursor is not None:
+        return decode_cursor(cursor)
+    return after_id
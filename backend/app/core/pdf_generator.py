@@ -1,40 +1,162 @@
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
+# ReportLab is imported inside the rendering functions: it is the heaviest
+# import in the app and only report card requests and render workers need it
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.models.grade import Grade
+from app.models.subject import Subject
 from app.models.absence import Absence
 from io import BytesIO
 from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+import hashlib
+import json
 
 
-def generate_report_card(student_id: int, db: Session) -> BytesIO:
-    """Generate PDF report card for a student."""
-    student = db.query(User).filter(User.id == student_id).first()
+class ReportCardData(NamedTuple):
+    """Everything a report card shows, as plain picklable values."""
+    student_id: int
+    name: str
+    email: str
+    report_date: str
+    # (subject name, grade, date) per grade
+    grades: List[Tuple[str, float, str]]
+    # (date, reason) per absence
+    absences: List[Tuple[str, Optional[str]]]
+
+    @property
+    def average(self) -> float:
+        if not self.grades:
+            return 0
+        return sum(grade for _, grade, _ in self.grades) / len(self.grades)
+
+    def content_hash(self) -> str:
+        """Hash of the card's content, used as its cache key and ETag.
+
+        The report date is part of it, as it is printed on the card; a cached
+        card is reused for the rest of the day.
+        """
+        body = json.dumps(self, separators=(",", ":"), default=str)
+        return hashlib.sha256(body.encode()).hexdigest()
+
+
+def load_report_card_data(student_id: int, db: Session) -> ReportCardData:
+    """Load a student's profile, grades and absences for a report card."""
+    student = db.query(User.name, User.email).filter(User.id == student_id).first()
     if not student:
         raise ValueError("Student not found")
     
-    # Get all grades for the student
-    grades = db.query(Grade).filter(Grade.student_id == student_id).all()
+    # Subject names come from an outer join rather than a lazy load per grade
+    grades = db.query(Subject.name, Grade.grade, Grade.created_at).select_from(Grade).outerjoin(
+        Subject, Subject.id == Grade.subject_id
+    ).filter(Grade.student_id == student_id).order_by(Grade.id).all()
+    
+    absences = db.query(Absence.date, Absence.reason).filter(
+        Absence.student_id == student_id
+    ).order_by(Absence.id).all()
+    
+    return ReportCardData(
+        student_id=student_id,
+        name=student.name,
+        email=student.email,
+        report_date=datetime.now().strftime('%Y-%m-%d'),
+        grades=[_grade_row(*row) for row in grades],
+        absences=[_absence_row(*row) for row in absences],
+    )
+
+
+def load_report_cards_data(db: Session, class_id: Optional[int] = None) -> List[ReportCardData]:
+    """Load report card data for every student, or those graded in one class.
+
+    Uses three set-based queries (students, grades with subject names,
+    absences) regardless of how many students are included.
+    """
+    students = db.query(User.id, User.name, User.email).filter(User.role == UserRole.STUDENT)
+    if class_id is not None:
+        graded_in_class = db.query(Grade.student_id).join(
+            Subject, Subject.id == Grade.subject_id
+        ).filter(Subject.class_id == class_id)
+        students = students.filter(User.id.in_(graded_in_class))
+    students = students.order_by(User.id).all()
+    student_ids = [student.id for student in students]
+    
+    grades_by_student = {student_id: [] for student_id in student_ids}
+    for student_id, subject_name, grade, created_at in db.query(
+        Grade.student_id, Subject.name, Grade.grade, Grade.created_at
+    ).select_from(Grade).outerjoin(
+        Subject, Subject.id == Grade.subject_id
+    ).filter(Grade.student_id.in_(student_ids)).order_by(Grade.id):
+        grades_by_student[student_id].append(_grade_row(subject_name, grade, created_at))
     
-    # Get absences
-    absences = db.query(Absence).filter(Absence.student_id == student_id).all()
+    absences_by_student = {student_id: [] for student_id in student_ids}
+    for student_id, date, reason in db.query(
+        Absence.student_id, Absence.date, Absence.reason
+    ).filter(Absence.student_id.in_(student_ids)).order_by(Absence.id):
+        absences_by_student[student_id].append(_absence_row(date, reason))
     
-    # Calculate statistics
-    total_grades = len(grades)
-    avg_grade = db.query(func.avg(Grade.grade)).filter(Grade.student_id == student_id).scalar() or 0
+    report_date = datetime.now().strftime('%Y-%m-%d')
+    return [
+        ReportCardData(
+            student_id=student.id,
+            name=student.name,
+            email=student.email,
+            report_date=report_date,
+            grades=grades_by_student[student.id],
+            absences=absences_by_student[student.id],
+        )
+        for student in students
+    ]
+
+
+def _grade_row(subject_name, grade, created_at) -> Tuple[str, float, str]:
+    return (
+        subject_name or 'N/A',
+        grade,
+        created_at.strftime('%Y-%m-%d') if created_at else 'N/A'
+    )
+
+
+def _absence_row(date, reason) -> Tuple[str, Optional[str]]:
+    return (date.strftime('%Y-%m-%d'), reason)
+
+
+def generate_report_card(student_id: int, db: Session) -> BytesIO:
+    """Generate PDF report card for a student."""
+    return BytesIO(render_report_card(load_report_card_data(student_id, db)))
+
+
+def render_report_card(data: ReportCardData) -> bytes:
+    """Render a report card to PDF bytes; safe to run in a worker process."""
+    return render_report_cards([data])
+
+
+def render_report_cards(cards: List[ReportCardData]) -> bytes:
+    """Render several report cards into one PDF, one card per page group."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, PageBreak
     
-    # Create PDF
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+    for index, data in enumerate(cards):
+        if index:
+            story.append(PageBreak())
+        story.extend(_report_card_story(data, styles))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def _report_card_story(data: ReportCardData, styles) -> list:
+    """Build the flowables of one report card."""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    
     story = []
     
-    styles = getSampleStyleSheet()
     title_style = ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
@@ -50,9 +172,9 @@ def generate_report_card(student_id: int, db: Session) -> BytesIO:
     
     # Student Info
     info_data = [
-        ['Student Name:', student.name],
-        ['Email:', student.email],
-        ['Report Date:', datetime.now().strftime('%Y-%m-%d')]
+        ['Student Name:', data.name],
+        ['Email:', data.email],
+        ['Report Date:', data.report_date]
     ]
     info_table = Table(info_data, colWidths=[2*inch, 4*inch])
     info_table.setStyle(TableStyle([
@@ -71,7 +193,7 @@ def generate_report_card(student_id: int, db: Session) -> BytesIO:
     # Statistics
     stats_data = [
         ['Total Grades', 'Average Grade', 'Total Absences'],
-        [str(total_grades), f"{avg_grade:.2f}", str(len(absences))]
+        [str(len(data.grades)), f"{data.average:.2f}", str(len(data.absences))]
     ]
     stats_table = Table(stats_data)
     stats_table.setStyle(TableStyle([
@@ -89,14 +211,10 @@ def generate_report_card(student_id: int, db: Session) -> BytesIO:
     story.append(Spacer(1, 0.3*inch))
     
     # Grades Table
-    if grades:
+    if data.grades:
         grades_data = [['Subject', 'Grade', 'Date']]
-        for grade in grades:
-            grades_data.append([
-                grade.subject.name if grade.subject else 'N/A',
-                f"{grade.grade:.2f}",
-                grade.created_at.strftime('%Y-%m-%d') if grade.created_at else 'N/A'
-            ])
+        for subject_name, grade, graded_on in data.grades:
+            grades_data.append([subject_name, f"{grade:.2f}", graded_on])
         
         grades_table = Table(grades_data, colWidths=[3*inch, 1.5*inch, 1.5*inch])
         grades_table.setStyle(TableStyle([
@@ -114,13 +232,10 @@ def generate_report_card(student_id: int, db: Session) -> BytesIO:
         story.append(Spacer(1, 0.3*inch))
     
     # Absences Table
-    if absences:
+    if data.absences:
         absences_data = [['Date', 'Reason']]
-        for absence in absences:
-            absences_data.append([
-                absence.date.strftime('%Y-%m-%d'),
-                absence.reason or 'N/A'
-            ])
+        for absent_on, reason in data.absences:
+            absences_data.append([absent_on, reason or 'N/A'])
         
         absences_table = Table(absences_data, colWidths=[3*inch, 3*inch])
         absences_table.setStyle(TableStyle([
@@ -136,7 +251,5 @@ def generate_report_card(student_id: int, db: Session) -> BytesIO:
         story.append(Paragraph("Absences", styles['Heading2']))
         story.append(absences_table)
     
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return story
 
@@ -0,0 +1,87 @@
+"""
+Relation Loading Options
+Lets list endpoints declare the relations they can serialize and eager-load
+only the ones a client asks for with ``?include=``
+"""
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, Query, status
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+
+class _WithoutRelations:
+    """Read-only view of an ORM object that hides some relations.
+
+    Response schemas read hidden relations as missing (so ``None``) instead
+    of triggering a lazy SELECT, which an async session cannot do anyway.
+    """
+
+    __slots__ = ("_obj", "_hidden")
+
+    def __init__(self, obj: Any, hidden: frozenset):
+        self._obj = obj
+        self._hidden = hidden
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self._hidden:
+            raise AttributeError(name)
+        return getattr(self._obj, name)
+
+
+def unwrap_relations(item: Any) -> Tuple[Any, frozenset]:
+    """The wrapped object and its hidden relations (none for a plain object)."""
+    if isinstance(item, _WithoutRelations):
+        return item._obj, item._hidden
+    return item, frozenset()
+
+
+class IncludedRelations(NamedTuple):
+    names: frozenset
+    excluded: frozenset
+    options: list
+
+    def serializable(self, items: Iterable[Any]) -> List[Any]:
+        """Wrap query results so only the included relations get serialized."""
+        if not self.excluded:
+            return list(items)
+        return [_WithoutRelations(item, self.excluded) for item in items]
+
+
+class RelationIncludes:
+    """FastAPI dependency turning ``?include=a,b`` into loader options.
+
+    Requested many-to-one relations are joined into the same SELECT and
+    collections are loaded with one extra ``IN`` query; the rest are neither
+    loaded nor serialized.
+    """
+
+    def __init__(self, **relations: InstrumentedAttribute):
+        self.relations: Dict[str, InstrumentedAttribute] = relations
+
+    def resolve(self, include: Optional[str]) -> IncludedRelations:
+        names = frozenset(part.strip() for part in (include or "").split(",") if part.strip())
+        unknown = names - self.relations.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown include: {', '.join(sorted(unknown))}. "
+                       f"Allowed: {', '.join(sorted(self.relations))}"
+            )
+        options = []
+        for name in names:
+            attribute = self.relations[name]
+            loader = selectinload if attribute.property.uselist else joinedload
+            options.append(loader(attribute))
+        return IncludedRelations(
+            names=names,
+            excluded=frozenset(self.relations.keys() - names),
+            options=options,
+        )
+
+    def __call__(
+        self,
+        include: Optional[str] = Query(
+            None, description="Comma-separated relations to embed in each item"
+        )
+    ) -> IncludedRelations:
+        return self.resolve(include)
@@ -0,0 +1,353 @@
+"""
+Rate Limiting
+Token buckets keyed by the authenticated user, or the client address for
+anonymous requests, kept in process memory or in a SQLite file shared by all
+workers of a host
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from anyio import to_thread
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.monitoring import UNMONITORED_PATHS
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit(NamedTuple):
+    """A bucket of ``capacity`` tokens refilled evenly over ``period`` seconds"""
+    capacity: int
+    period: float
+    text: str
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / self.period
+
+
+@lru_cache(maxsize=32)
+def parse_rate_limit(spec: str) -> RateLimit:
+    """Parse ``"<count>/<second|minute|hour|day>"``, e.g. ``"100/minute"``."""
+    count, _, period = spec.partition("/")
+    period = period.strip().rstrip("s")
+    try:
+        capacity = int(count)
+        seconds = PERIODS[period]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    if capacity < 1:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    return RateLimit(capacity, seconds, f"{capacity} per 1 {period}")
+
+
+def _take(tokens: float, limit: RateLimit, count: int) -> Tuple[int, float, float]:
+    """(tokens taken, tokens left, seconds until the next token if none was taken)"""
+    taken = min(count, int(tokens))
+    tokens -= taken
+    return taken, tokens, 0.0 if taken else (1 - tokens) / limit.rate
+
+
+def _refill(tokens: float, updated: float, limit: RateLimit, now: float) -> float:
+    return min(float(limit.capacity), tokens + max(0.0, now - updated) * limit.rate)
+
+
+class MemoryBucketStore:
+    """Buckets of the current process only"""
+
+    shared = False
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated, time the bucket is full again)
+        self._buckets: dict = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit, count: int, now: float) -> Tuple[int, float]:
+        """Take up to ``count`` tokens: (taken, seconds to wait if none were taken)"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            tokens = limit.capacity if bucket is None else _refill(bucket[0], bucket[1], limit, now)
+            taken, tokens, wait = _take(tokens, limit, count)
+            self._buckets[key] = (tokens, now, now + (limit.capacity - tokens) / limit.rate)
+            if len(self._buckets) > self.max_keys:
+                # A full bucket is the same as no bucket
+                self._buckets = {k: b for k, b in self._buckets.items() if b[2] > now}
+        return taken, wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, so every worker on the host draws from the same one.
+
+    Each take is one short ``BEGIN IMMEDIATE`` transaction; the file is in WAL
+    mode without fsync, as losing buckets in a crash only resets the limits.
+    """
+
+    shared = True
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, busy_timeout: float = 1.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._takes = 0
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # A connection must never be used on both sides of a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def take(self, key: str, limit: RateLimit, count: int, now: float) -> Tuple[int, float]:
+        """Take up to ``count`` tokens: (taken, seconds to wait if none were taken)"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = limit.capacity if row is None else _refill(row[0], row[1], limit, now)
+                taken, tokens, wait = _take(tokens, limit, count)
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                    (key, tokens, now, now + (limit.capacity - tokens) / limit.rate),
+                )
+                self._takes += 1
+                if self._takes % self.PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return taken, wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM buckets")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RateLimiter:
+    """Token-bucket limiter with an in-process fast path.
+
+    With a shared store a worker takes a small lease of tokens at a time
+    (``lease_fraction`` of the bucket) and spends it locally, and remembers
+    when an empty bucket refills, so most requests never reach the store. A
+    lease lapses after the time the bucket needs to earn it back, so unused
+    tokens can not pile up: a client gets at most the configured rate.
+    """
+
+    def __init__(self, store, lease_fraction: float = 0.1, max_keys: int = 10000):
+        self.store = store
+        self.lease_fraction = lease_fraction
+        self.max_keys = max_keys
+        # key -> [leased tokens, lease expiry]; 0 tokens means blocked until expiry
+        self._local: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: RateLimit) -> float:
+        """Spend one token of ``key``'s bucket; 0 if allowed, else seconds to wait."""
+        now = time.time()
+        retry_after = self._hit_local(key, now)
+        if retry_after is not None:
+            return retry_after
+        return self._settle(key, limit, now, self._take(key, limit, now))
+
+    async def hit_async(self, key: str, limit: RateLimit) -> float:
+        """``hit`` for the event loop: a shared store is reached from a worker thread.
+
+        Its transaction can wait on other workers' locks, which would otherwise
+        stall every request this worker is serving.
+        """
+        now = time.time()
+        retry_after = self._hit_local(key, now)
+        if retry_after is not None:
+            return retry_after
+        if self.store.shared:
+            result = await to_thread.run_sync(self._take, key, limit, now)
+        else:
+            result = self._take(key, limit, now)
+        return self._settle(key, limit, now, result)
+
+    def _hit_local(self, key: str, now: float) -> Optional[float]:
+        """Spend from this worker's lease, or the wait of a known-empty bucket; None if the store decides"""
+        with self._lock:
+            local = self._local.get(key)
+            if local is not None and now < local[1]:
+                if local[0] == 0:
+                    return local[1] - now
+                local[0] -= 1
+                if local[0] == 0:
+                    del self._local[key]
+                return 0.0
+        return None
+
+    def _take(self, key: str, limit: RateLimit, now: float) -> Optional[Tuple[int, float]]:
+        """Take a lease from the store; None when the store fails"""
+        lease = max(1, int(limit.capacity * self.lease_fraction)) if self.store.shared else 1
+        try:
+            return self.store.take(key, limit, lease, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return None
+
+    def _settle(self, key: str, limit: RateLimit, now: float, result: Optional[Tuple[int, float]]) -> float:
+        # Fail open: a broken store must not turn every request into a 500
+        if result is None:
+            return 0.0
+        taken, wait = result
+        with self._lock:
+            if taken > 1:
+                self._remember(key, [taken - 1, now + taken / limit.rate])
+            elif taken == 0:
+                self._remember(key, [0, now + wait])
+            else:
+                self._local.pop(key, None)
+        return 0.0 if taken else wait
+
+    def _remember(self, key: str, entry: list) -> None:
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_keys:
+            self._local.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+        self.store.clear()
+
+
+def create_bucket_store(path: Optional[str]):
+    """A SQLite store shared by the workers when ``path`` is set, in-memory otherwise"""
+    if path:
+        return SQLiteBucketStore(path)
+    return MemoryBucketStore()
+
+
+rate_limiter = RateLimiter(create_bucket_store(settings.rate_limit_storage))
+
+# Access token -> (user id, token expiry); "" for tokens that do not verify
+_token_subjects = TTLCache(ttl_seconds=60, max_entries=4096)
+
+
+def _token_subject(token: str) -> str:
+    entry = _token_subjects.get(token)
+    # A cached subject is only good until the token itself expires
+    if entry is None or entry[1] <= time.time():
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            subject = str(payload.get("sub") or "") if payload.get("type") == "access" else ""
+            expires = float(payload.get("exp", math.inf))
+        except JWTError:
+            subject, expires = "", math.inf
+        entry = (subject, expires)
+        _token_subjects.set(token, entry)
+    return entry[0]
+
+
+def client_address(scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def client_key(scope) -> str:
+    """``user:<id>`` for a valid bearer token, ``ip:<address>`` otherwise.
+
+    Students behind one school NAT share an address but not a bucket once
+    they are signed in.
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                subject = _token_subject(token.strip())
+                if subject:
+                    return f"user:{subject}"
+            break
+    return f"ip:{client_address(scope)}"
+
+
+def rate_limit_exceeded(limit: RateLimit, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Rate limit exceeded: {limit.text}",
+        headers={"Retry-After": str(math.ceil(retry_after))},
+    )
+
+
+async def enforce_rate_limit(key: str, spec: str) -> None:
+    """Raise 429 once ``key`` has used up the ``spec`` limit."""
+    limit = parse_rate_limit(spec)
+    retry_after = await rate_limiter.hit_async(key, limit)
+    if retry_after:
+        raise rate_limit_exceeded(limit, retry_after)
+
+
+async def enforce_login_rate_limits(scope, email: str) -> None:
+    """Raise 429 once a login attempt is over the account or address limit.
+
+    The account bucket stops password guessing against one account from
+    anywhere. The address bucket only stops one client spraying many
+    accounts; it is sized for a school signing in from behind one NAT.
+    Successful logins draw from both, like failed ones: a valid login spends
+    a token before the password has been checked.
+    """
+    await enforce_rate_limit(f"login-ip:{client_address(scope)}", settings.rate_limit_login_ip)
+    await enforce_rate_limit(f"login:{email.lower()}", settings.rate_limit_login)
+
+
+class RateLimitMiddleware:
+    """Applies ``RATE_LIMIT_DEFAULT`` to every request except probes and scrapes.
+
+    Logins are left out too: they are anonymous, so a class behind one NAT
+    would share a single address bucket, and the route has its own limits.
+    """
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+        self.exempt_paths = UNMONITORED_PATHS | {f"{settings.api_v1_prefix}/auth/login"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        limit = parse_rate_limit(settings.rate_limit_default)
+        retry_after = await self.limiter.hit_async(client_key(scope), limit)
+        if retry_after:
+            error = rate_limit_exceeded(limit, retry_after)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,108 @@
+"""
+Refresh Token Store Maintenance
+Per-worker filter of revoked refresh tokens and the background job that
+deletes expired refresh token rows in chunks
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import delete, select
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.refresh_token import RefreshToken
+
+logger = logging.getLogger(__name__)
+
+# Hashes of refresh tokens this worker has seen revoked. Exact (an LRU, not
+# a probabilistic filter), so a hit can reject a refresh without a query; a
+# miss still goes to the database, which stays the source of truth. Entries
+# can expire with the tokens themselves.
+revoked_refresh_tokens = TTLCache(
+    ttl_seconds=settings.jwt_refresh_expire_days * 86400,
+    max_entries=settings.revoked_token_cache_size,
+)
+
+
+def hash_refresh_token(token: str) -> str:
+    """SHA-256 hex digest stored in place of the token."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def remember_revoked(token_hashes: Iterable[str]) -> None:
+    """Record revoked token hashes so reuse in this worker skips the database."""
+    for token_hash in token_hashes:
+        revoked_refresh_tokens.set(token_hash, True)
+
+
+def is_known_revoked(token_hash: str) -> bool:
+    return revoked_refresh_tokens.get(token_hash) is not None
+
+
+def purge_expired_refresh_tokens(db, chunk_size: int, now: Optional[datetime] = None) -> int:
+    """Delete expired refresh tokens, ``chunk_size`` rows per transaction.
+
+    Short transactions keep the table's write lock from being held across a
+    large backlog. Returns the number of rows deleted.
+    """
+    now = now or datetime.utcnow()
+    deleted = 0
+    while True:
+        ids = db.execute(
+            select(RefreshToken.id).where(RefreshToken.expires_at < now).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+
+
+class RefreshTokenPurger:
+    """Deletes expired refresh tokens on an interval in a background task"""
+
+    def __init__(self, interval: float, chunk_size: int, session_factory=SessionLocal):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def purge(self) -> int:
+        with self.session_factory() as db:
+            deleted = purge_expired_refresh_tokens(db, self.chunk_size)
+        if deleted:
+            logger.info(f"Purged {deleted} expired refresh tokens")
+        return deleted
+
+    async def _run(self):
+        while True:
+            # Wait first: workers starting together do not all purge at once
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.purge)
+            except Exception:
+                logger.exception("Refresh token purge failed")
+
+    def start(self) -> None:
+        """Start purging on the running event loop (idempotent; off when interval is 0)"""
+        if self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+refresh_token_purger = RefreshTokenPurger(
+    interval=settings.refresh_token_purge_interval,
+    chunk_size=settings.refresh_token_purge_chunk_size,
+)
@@ -0,0 +1,200 @@
+"""
+Batch Report Card Generation
+Renders the report cards of a class or the whole school into one ZIP or merged PDF
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Optional
+from app.core.database import SessionLocal
+from app.core.pdf_generator import ReportCardData, load_report_cards_data, render_report_card, render_report_cards
+from app.core.report_cards import report_card_cache, report_card_renderer
+
+BATCH_FORMATS = ("zip", "pdf")
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def run_report_card_batch(
+    cards: List[ReportCardData],
+    output_path: Path,
+    output_format: str = "zip",
+    max_workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    executor: Optional[Executor] = None,
+) -> Path:
+    """Render ``cards`` to ``output_path`` and return it.
+
+    ZIP output renders one PDF per student across a process pool, reusing
+    cached renders: ``executor`` when given, else a pool of ``max_workers``
+    (one per core by default) for this batch. PDF output merges every card
+    into one document, which ReportLab can only build in a single process:
+    one worker of the same pool builds it.
+    """
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"Unsupported batch format '{output_format}'")
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    total = len(cards)
+    report = on_progress or (lambda done, total: None)
+    report(0, total)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            if output_format == "pdf":
+                tmp.write(_render_merged(cards, executor))
+                report(total, total)
+            else:
+                _write_zip(tmp, cards, max_workers, executor, report)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return output_path
+
+
+def _render_merged(cards: List[ReportCardData], executor: Optional[Executor]) -> bytes:
+    if executor is not None:
+        return executor.submit(render_report_cards, cards).result()
+    with ProcessPoolExecutor(max_workers=1) as own_executor:
+        return own_executor.submit(render_report_cards, cards).result()
+
+
+def _write_zip(
+    fileobj, cards: List[ReportCardData], max_workers: Optional[int],
+    executor: Optional[Executor], report: ProgressCallback,
+):
+    total = len(cards)
+    done = 0
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        misses = {}
+        for data in cards:
+            key = data.content_hash()
+            pdf = report_card_cache.get(key)
+            if pdf is None:
+                misses[key] = data
+                continue
+            archive.writestr(_card_filename(data), pdf)
+            done += 1
+            report(done, total)
+        
+        if not misses:
+            return
+        if executor is not None:
+            _render_misses(archive, misses, executor, done, total, report)
+            return
+        with ProcessPoolExecutor(max_workers=max_workers) as own_executor:
+            _render_misses(archive, misses, own_executor, done, total, report)
+
+
+def _render_misses(archive, misses: dict, executor: Executor, done: int, total: int, report: ProgressCallback):
+    futures = {
+        executor.submit(render_report_card, data): (key, data)
+        for key, data in misses.items()
+    }
+    for future in as_completed(futures):
+        key, data = futures[future]
+        pdf = future.result()
+        report_card_cache.set(key, pdf)
+        archive.writestr(_card_filename(data), pdf)
+        done += 1
+        report(done, total)
+
+
+def _card_filename(data: ReportCardData) -> str:
+    return f"report_card_{data.student_id}.pdf"
+
+
+class BatchJobStore:
+    """Batch job status and output files kept on disk.
+
+    Any worker process on the host can therefore report a job's progress or
+    serve its output, not just the one that ran it. A running job rewrites its
+    status at least every ``heartbeat_interval`` seconds; one that has not for
+    ``stale_after`` seconds lost its worker and reads back as failed.
+    """
+
+    heartbeat_interval = 10.0
+    stale_after = 120.0
+
+    def __init__(self, directory: str, session_factory=SessionLocal):
+        self.directory = Path(directory)
+        self.session_factory = session_factory
+
+    def status_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def output_path(self, job_id: str, output_format: str) -> Path:
+        return self.directory / f"{job_id}.{output_format}"
+
+    def load(self, job_id: str) -> Optional[dict]:
+        try:
+            status = json.loads(self.status_path(job_id).read_text())
+        except (OSError, ValueError):
+            return None
+        if status["status"] in ("pending", "running") and (
+            time.time() - status.get("heartbeat_at", 0) > self.stale_after
+        ):
+            status.update(status="failed", error="Batch job stopped: its worker exited")
+            self.save(status, heartbeat=False)
+        return status
+
+    def save(self, status: dict, heartbeat: bool = True) -> None:
+        if heartbeat:
+            status["heartbeat_at"] = time.time()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.status_path(status["job_id"])
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(status, tmp)
+        os.replace(tmp_path, path)
+
+    def run(self, status: dict) -> None:
+        """Load a saved job's cards and render them, recording progress in its status file.
+
+        Cards render in the shared report card pool; a merged PDF, which has
+        no per-card progress, is kept alive by the heartbeat thread.
+        """
+        lock = threading.Lock()
+        stopped = threading.Event()
+
+        def on_progress(done: int, total: int) -> None:
+            with lock:
+                status.update(completed=done, total=total)
+                self.save(status)
+
+        def beat() -> None:
+            while not stopped.wait(self.heartbeat_interval):
+                with lock:
+                    self.save(status)
+
+        with lock:
+            status["status"] = "running"
+            self.save(status)
+        heartbeat = threading.Thread(target=beat, name=f"batch-{status['job_id']}", daemon=True)
+        heartbeat.start()
+        try:
+            class_id = None if status["class_id"] == "all" else status["class_id"]
+            with self.session_factory() as db:
+                cards = load_report_cards_data(db, class_id)
+            run_report_card_batch(
+                cards,
+                self.output_path(status["job_id"], status["format"]),
+                output_format=status["format"],
+                on_progress=on_progress,
+                executor=report_card_renderer.executor,
+            )
+            result = {"status": "completed"}
+        except Exception as e:
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            stopped.set()
+            heartbeat.join()
+        status.update(result)
+        self.save(status)
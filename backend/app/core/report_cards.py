@@ -0,0 +1,159 @@
+"""
+Report Card Rendering
+Content-addressed cache of rendered report cards, with misses rendered in a process pool
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.pdf_generator import ReportCardData, render_report_card
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCardCache:
+    """Rendered PDFs keyed by content hash, in memory and optionally on disk.
+
+    Keys change whenever the card's content does, so entries never go stale;
+    the disk copy lets every worker process share a render. Superseded cards
+    are never read again, so the directory is trimmed to ``max_disk_entries``
+    files, least recently used first. Trimming lists the whole directory, so
+    it runs once every ``evict_every`` writes of this process; each worker
+    can overshoot the limit by that many files.
+    """
+
+    def __init__(
+        self, directory: Optional[str], ttl_seconds: float, max_entries: int, max_disk_entries: int
+    ):
+        self.directory = Path(directory) if directory else None
+        self.max_disk_entries = max_disk_entries
+        self.evict_every = max(1, max_disk_entries // 10)
+        self.memory = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Optional[Path]:
+        return self.directory / f"{key}.pdf" if self.directory else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        pdf = self.memory.get(key)
+        if pdf is not None:
+            return pdf
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            pdf = path.read_bytes()
+            # The mtime doubles as the last use for eviction
+            os.utime(path)
+        except OSError:
+            return None
+        self.memory.set(key, pdf)
+        return pdf
+
+    def set(self, key: str, pdf: bytes) -> None:
+        self.memory.set(key, pdf)
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so other workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(pdf)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write report card cache file {path}: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            if self._writes < self.evict_every:
+                return
+            self._writes = 0
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used files beyond ``max_disk_entries``."""
+        entries = []
+        for path in self.directory.glob("*.pdf"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except OSError:
+                # Removed by another worker meanwhile
+                continue
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return
+        entries.sort()
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+
+class ReportCardRenderer:
+    """Renders cache misses in a process pool, sharing one render per key.
+
+    The pool is created on first use so it is never inherited across a fork.
+    """
+
+    def __init__(self, cache: ReportCardCache, max_workers: int):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """The render pool; batch jobs share it, so renders never exceed its size."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def render(self, data: ReportCardData, key: Optional[str] = None) -> bytes:
+        """Return the PDF for ``data``, rendering it only if no cached copy exists."""
+        key = key or data.content_hash()
+        pdf = self.cache.get(key)
+        if pdf is not None:
+            return pdf
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, render_report_card, data)
+        self._pending[key] = future
+        try:
+            pdf = await future
+        finally:
+            self._pending.pop(key, None)
+        self.cache.set(key, pdf)
+        return pdf
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+report_card_cache = ReportCardCache(
+    directory=settings.report_card_cache_dir,
+    ttl_seconds=settings.report_card_cache_ttl,
+    max_entries=settings.report_card_cache_entries,
+    max_disk_entries=settings.report_card_cache_disk_entries,
+)
+report_card_renderer = ReportCardRenderer(
+    report_card_cache, max_workers=settings.report_render_workers
+)
@@ -0,0 +1,102 @@
+"""
+Teacher Scope Resolver
+Resolves the classes, subjects and students a teacher can see in one query,
+with a per-process cache invalidated whenever classes, subjects or grades change
+"""
+from typing import FrozenSet, NamedTuple
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.table_versions import on_commit
+from app.models.class_model import Class
+from app.models.subject import Subject
+from app.models.grade import Grade
+
+
+class TeacherScope(NamedTuple):
+    class_ids: FrozenSet[int]
+    subject_ids: FrozenSet[int]
+    student_ids: FrozenSet[int]
+
+
+class TeacherScopeCache(TTLCache):
+    """Bounded TTL cache of teacher scopes keyed by teacher id.
+
+    Each worker process keeps its own copy, so the TTL bounds how long another
+    worker's write can go unnoticed; commits in this process invalidate at once.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_entries: int = 1024):
+        super().__init__(ttl_seconds, max_entries)
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, teacher_id: int, scope: TeacherScope, generation: int) -> None:
+        """Store a scope unless an invalidation happened while it was being built."""
+        with self._lock:
+            if generation == self._generation:
+                super().set(teacher_id, scope)
+
+    def invalidate(self) -> None:
+        """Drop every cached scope; any write can move students between teachers."""
+        with self._lock:
+            self._generation += 1
+            self.clear()
+
+
+teacher_scope_cache = TeacherScopeCache(ttl_seconds=settings.teacher_scope_cache_ttl)
+
+
+def _teacher_scope_statement(teacher_id: int) -> Select:
+    """Build the Class->Subject->Grade join that yields a teacher's scope rows."""
+    return select(Class.id, Subject.id, Grade.student_id).outerjoin(
+        Subject, Subject.class_id == Class.id
+    ).outerjoin(
+        Grade, Grade.subject_id == Subject.id
+    ).where(
+        Class.teacher_id == teacher_id
+    ).distinct()
+
+
+def _scope_from_rows(rows) -> TeacherScope:
+    return TeacherScope(
+        class_ids=frozenset(row[0] for row in rows),
+        subject_ids=frozenset(row[1] for row in rows if row[1] is not None),
+        student_ids=frozenset(row[2] for row in rows if row[2] is not None),
+    )
+
+
+def resolve_teacher_scope(db: Session, teacher_id: int) -> TeacherScope:
+    """Return the class, subject and student ids visible to a teacher."""
+    scope = teacher_scope_cache.get(teacher_id)
+    if scope is not None:
+        return scope
+
+    generation = teacher_scope_cache.generation
+    scope = _scope_from_rows(db.execute(_teacher_scope_statement(teacher_id)).all())
+    teacher_scope_cache.set(teacher_id, scope, generation)
+    return scope
+
+
+async def resolve_teacher_scope_async(db: AsyncSession, teacher_id: int) -> TeacherScope:
+    """Async variant of resolve_teacher_scope sharing the same cache."""
+    scope = teacher_scope_cache.get(teacher_id)
+    if scope is not None:
+        return scope
+
+    generation = teacher_scope_cache.generation
+    result = await db.execute(_teacher_scope_statement(teacher_id))
+    scope = _scope_from_rows(result.all())
+    teacher_scope_cache.set(teacher_id, scope, generation)
+    return scope
+
+
+@on_commit(Class.__tablename__, Subject.__tablename__, Grade.__tablename__)
+def _invalidate_on_commit():
+    """Invalidate cached scopes once a commit touching classes, subjects or grades lands."""
+    teacher_scope_cache.invalidate()
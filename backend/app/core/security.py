@@ -1,26 +1,117 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.monitoring import metrics_store
+from app.core.table_versions import table_versions
 from app.models.user import User, UserRole
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    """The bcrypt CryptContext, built on first use; passlib is only imported then."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_v1_prefix}/auth/login")
 
+# (users table version, authorization fields) of recently seen users, keyed by user id
+user_cache = TTLCache(ttl_seconds=settings.auth_user_cache_ttl, max_entries=4096)
+
 
 def get_password_hash(password: str) -> str:
     """Hash a password."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash if the stored one uses outdated parameters."""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def _timed_call(fn: Callable, *args):
+    """Run ``fn`` in a pool worker and report when it actually started."""
+    return time.time(), fn(*args)
+
+
+class PasswordHashPool:
+    """Size-limited executor that keeps bcrypt off the request threadpool.
+
+    The executor is created on first use so it is never inherited across a fork.
+    """
+
+    def __init__(self, max_workers: int, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        metrics_store.password_hash_workers = max_workers
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hash"
+                    )
+            return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """Run ``fn(*args)`` in the pool, recording queue depth and wait time."""
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        metrics_store.record_password_hash_submitted()
+        started_at = submitted_at
+        try:
+            started_at, result = await loop.run_in_executor(
+                self._get_executor(), _timed_call, fn, *args
+            )
+            return result
+        finally:
+            metrics_store.record_password_hash_finished(max(started_at - submitted_at, 0.0))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    max_workers=settings.password_hash_workers,
+    use_processes=settings.password_hash_use_processes,
+)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the password hashing pool."""
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the password hashing pool, returning a rehash if one is due."""
+    return await password_hash_pool.run(verify_and_update_password, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -31,16 +122,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.jwt_expire_minutes)
     
-    to_encode.update({"exp": expire, "type": "access"})
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
 def create_refresh_token(data: dict) -> str:
-    """Create JWT refresh token."""
+    """Create JWT refresh token.
+
+    The random jti keeps two tokens issued in the same second distinct, as
+    the stored hashes must be unique.
+    """
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.jwt_refresh_expire_days)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
@@ -62,11 +157,24 @@ def verify_token(token: str, token_type: str = "access") -> dict:
         )
 
 
+def invalidate_cached_user(user_id: int) -> None:
+    """Forget the cached authorization fields of a user in this worker.
+
+    Other workers drop theirs once the commit bumps the users table version.
+    """
+    user_cache.pop(int(user_id))
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
-    """Get current authenticated user."""
+    """Get current authenticated user.
+
+    The returned user is detached from the session when it comes from the
+    token claims or the user cache; only ``id``, ``name``, ``email`` and
+    ``role`` are populated.
+    """
     payload = verify_token(token)
     user_id: int = payload.get("sub")
     
@@ -75,6 +183,23 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
+    user_id = int(user_id)
+    
+    if settings.auth_trust_token_claims and payload.get("role"):
+        try:
+            role = UserRole(payload["role"])
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials"
+            )
+        return User(id=user_id, role=role)
+    
+    # Read before the query, so a commit landing in between leaves a stale token
+    version = table_versions.get("users")
+    cached = user_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return User(**cached[1])
     
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
@@ -82,6 +207,9 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+    user_cache.set(user_id, (version, {
+        "id": user.id, "name": user.name, "email": user.email, "role": user.role
+    }))
     return user
 
 
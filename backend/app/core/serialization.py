@@ -0,0 +1,149 @@
+"""
+Fast List Serialization
+Encodes list endpoint results straight from ORM rows with orjson, or as
+MessagePack for clients that ask for it, instead of validating every item
+into the response model and encoding it with the json module
+"""
+import typing
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Optional
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from app.core.config import settings
+from app.core.query_options import unwrap_relations
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+@lru_cache(maxsize=1)
+def _msgpack():
+    """The msgpack module, or None when it is not installed (JSON only)"""
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: type) -> TypeAdapter:
+    """Cached ``TypeAdapter(List[model])``, for models the row builder can not handle."""
+    return TypeAdapter(List[model])
+
+
+def _nested_model(annotation) -> Optional[type]:
+    """``X`` for a field typed ``X`` or ``Optional[X]`` where X is a model"""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        annotation = args[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
+
+def _is_plain(model: type) -> bool:
+    """True when dumping the model is just reading its fields' attributes"""
+    decorators = model.__pydantic_decorators__
+    if (decorators.validators or decorators.field_validators or decorators.root_validators
+            or decorators.field_serializers or decorators.model_serializers
+            or decorators.model_validators or decorators.computed_fields):
+        return False
+    for name, field in model.model_fields.items():
+        if field.alias not in (None, name) or field.serialization_alias not in (None, name):
+            return False
+        nested = _nested_model(field.annotation)
+        if nested is not None and not _is_plain(nested):
+            return False
+        # Collections may hold models; leave them to pydantic
+        for annotation in (field.annotation, *typing.get_args(field.annotation)):
+            if typing.get_origin(annotation) in (list, dict, set, tuple, frozenset):
+                return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def row_builder(model: type) -> Optional[Callable[[Any, dict], dict]]:
+    """A function turning an ORM object into the model's dump, or None if not plain.
+
+    Values come from the object's loaded state, so nothing is validated or
+    lazy-loaded. Nested objects are built once per serialization and reused,
+    as the same student or subject repeats on many grade rows.
+    """
+    if not _is_plain(model):
+        return None
+    scalars = []
+    nested = []
+    for name, field in model.model_fields.items():
+        nested_model = _nested_model(field.annotation)
+        if nested_model is None:
+            scalars.append(name)
+        else:
+            nested.append((name, row_builder(nested_model)))
+
+    def build(item: Any, memo: dict) -> dict:
+        obj, hidden = unwrap_relations(item)
+        state = getattr(obj, "__dict__", {})
+        row = {name: state[name] if name in state else getattr(obj, name, None) for name in scalars}
+        for name, build_nested in nested:
+            value = None if name in hidden else state[name] if name in state else getattr(obj, name, None)
+            if value is None:
+                row[name] = None
+                continue
+            key = id(value)
+            if key not in memo:
+                memo[key] = build_nested(value, memo)
+            row[name] = memo[key]
+        return row
+
+    return build
+
+
+def dump_list(items: Iterable[Any], model: type) -> list:
+    """JSON-ready dicts for ``items`` as ``List[model]`` would dump them"""
+    build = row_builder(model)
+    if build is None:
+        adapter = list_adapter(model)
+        return adapter.dump_python(adapter.validate_python(list(items), from_attributes=True), mode="json")
+    memo: dict = {}
+    return [build(item, memo) for item in items]
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return MSGPACK_MEDIA_TYPE in accept and _msgpack() is not None
+
+
+def list_response(
+    request: Request, items: Iterable[Any], model: type, response: Optional[Response] = None
+) -> Any:
+    """Serialize a list endpoint's result, bypassing FastAPI's response_model pass.
+
+    Routes opt in by returning this; with ``FAST_LIST_SERIALIZATION`` off the
+    items are returned as they are for FastAPI to validate. ``Accept:
+    application/msgpack`` gets MessagePack (when msgpack is installed).
+    Headers already set on ``response`` are carried over.
+    """
+    if not settings.fast_list_serialization:
+        return items
+    rows = dump_list(items, model)
+    if wants_msgpack(request):
+        body = _msgpack().packb(rows, default=_msgpack_default)
+        media_type = MSGPACK_MEDIA_TYPE
+    else:
+        body = orjson.dumps(rows, option=orjson.OPT_UTC_Z)
+        media_type = "application/json"
+    fast = Response(content=body, media_type=media_type)
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                fast.headers.append(name, value)
+    fast.headers.append("Vary", "Accept")
+    return fast
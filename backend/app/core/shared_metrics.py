@@ -0,0 +1,201 @@
+"""
+Metric value storage shared across worker processes
+Each process writes its own counters; readers aggregate every process's values
+"""
+import glob
+import mmap
+import os
+import struct
+from typing import Dict, Optional
+
+# Key prefixes selecting how values from several processes are combined:
+# plain keys are counters and summed, "max:" keys keep the largest value and
+# "gauge:" keys are summed over the processes that are still running
+MAX_PREFIX = "max:"
+GAUGE_PREFIX = "gauge:"
+
+_HEADER = struct.Struct("<I4x")
+_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_SIZE = 64 * 1024
+
+
+class MetricValues:
+    """Flat ``key -> float`` metric values of the current process"""
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+
+    def inc(self, key: str, amount: float = 1.0) -> None:
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key: str, value: float) -> None:
+        self._values[key] = value
+
+    def set_max(self, key: str, value: float) -> None:
+        if value > self._values.get(key, 0.0):
+            self.set(key, value)
+
+    def get(self, key: str) -> float:
+        return self._values.get(key, 0.0)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Values to report; only this process's for the in-memory store"""
+        return dict(self._values)
+
+
+class MmapMetricValues(MetricValues):
+    """Metric values mirrored into a per-process memory-mapped file.
+
+    Every worker only writes its own ``metrics_<pid>.db``, so recording needs
+    no lock; an entry is written before the header's used size is advanced,
+    so readers never see a partial entry. Files outlive their worker, keeping
+    the counters of restarted workers in the totals.
+    """
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        self._mmap: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        self._used = _HEADER.size
+        # key -> offset of its value in the file
+        self._positions: Dict[str, int] = {}
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # The child must not write into its parent's file; configuration
+        # gauges carry over, activity counters start from zero
+        self._values = {k: v for k, v in self._values.items() if k.startswith(GAUGE_PREFIX)}
+        self._mmap = self._fd = None
+        self._used = _HEADER.size
+        self._positions = {}
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"metrics_{os.getpid()}.db")
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size == 0:
+            size = _INITIAL_SIZE
+            os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        # A reused pid picks up where the dead worker's file left off
+        carried = dict(self._values)
+        self._values = {}
+        for key, value, offset in _entries(self._mmap):
+            self._values[key] = value
+            self._positions[key] = offset
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        for key, value in carried.items():
+            self.set(key, value)
+
+    def _append(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        padding = -(_LENGTH.size + len(encoded)) % 8
+        size = _LENGTH.size + len(encoded) + padding + _VALUE.size
+        if self._used + size > len(self._mmap):
+            self._grow(self._used + size)
+        _LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        self._mmap[self._used + _LENGTH.size:self._used + _LENGTH.size + len(encoded)] = encoded
+        offset = self._used + size - _VALUE.size
+        _VALUE.pack_into(self._mmap, offset, 0.0)
+        self._used += size
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = offset
+        return offset
+
+    def _grow(self, needed: int) -> None:
+        size = len(self._mmap)
+        while size < needed:
+            size *= 2
+        self._mmap.close()
+        os.ftruncate(self._fd, size)
+        self._mmap = mmap.mmap(self._fd, size)
+
+    def set(self, key: str, value: float) -> None:
+        if self._mmap is None:
+            if key.startswith(GAUGE_PREFIX):
+                # Configuration gauges are written with the first activity, so a
+                # preloading master that never serves requests is not counted
+                self._values[key] = value
+                return
+            self._open()
+        offset = self._positions.get(key)
+        if offset is None:
+            offset = self._append(key)
+        self._values[key] = value
+        _VALUE.pack_into(self._mmap, offset, value)
+
+    def inc(self, key: str, amount: float = 1.0) -> None:
+        if self._mmap is None:
+            self._open()
+        self.set(key, self._values.get(key, 0.0) + amount)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Values of every worker that has written to the directory"""
+        return read_metrics_dir(self.directory)
+
+
+def _entries(buffer):
+    """Yield (key, value, value offset) for each entry of a metrics file"""
+    used = min(_HEADER.unpack_from(buffer, 0)[0], len(buffer))
+    position = _HEADER.size
+    while position + _LENGTH.size <= used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(buffer[start:start + length]).decode("utf-8")
+        offset = start + length + (-(_LENGTH.size + length) % 8)
+        if offset + _VALUE.size > used:
+            return
+        yield key, _VALUE.unpack_from(buffer, offset)[0], offset
+        position = offset + _VALUE.size
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_metrics_dir(directory: str) -> Dict[str, float]:
+    """Aggregate the metric files of all workers in ``directory``"""
+    totals: Dict[str, float] = {}
+    for path in glob.glob(os.path.join(directory, "metrics_*.db")):
+        try:
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".db")])
+            with open(path, "rb") as f:
+                data = f.read()
+        except (ValueError, OSError):
+            continue
+        if len(data) < _HEADER.size:
+            continue
+        running = None
+        for key, value, _ in _entries(data):
+            if key.startswith(MAX_PREFIX):
+                totals[key] = max(totals.get(key, 0.0), value)
+                continue
+            if key.startswith(GAUGE_PREFIX):
+                if running is None:
+                    running = _is_running(pid)
+                if not running:
+                    continue
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def clear_metrics_dir(directory: str) -> None:
+    """Remove the metric files of a previous run (call before workers start)"""
+    for path in glob.glob(os.path.join(directory, "metrics_*.db")):
+        os.remove(path)
+
+
+def create_metric_values(directory: Optional[str]) -> MetricValues:
+    """Shared file-backed values when ``directory`` is set, in-memory otherwise"""
+    if directory:
+        return MmapMetricValues(directory)
+    return MetricValues()
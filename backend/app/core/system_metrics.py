@@ -0,0 +1,182 @@
+"""
+Background System Metrics Sampler
+Collects CPU, memory, disk, connection pool and database liveness data on an
+interval, so metrics and health endpoints answer from a snapshot without I/O
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import async_engine, engine
+
+logger = logging.getLogger(__name__)
+
+
+def _pool_stats(pool) -> dict:
+    """Size and checked-out connections of a pool that tracks them"""
+    if not hasattr(pool, "checkedout"):
+        return {"class": type(pool).__name__}
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": max(getattr(pool, "_max_overflow", 0), 0),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def _system_stats() -> dict:
+    """CPU usage since the previous sample, memory and disk usage"""
+    try:
+        # Imported on first use: workers that are never scraped do not load psutil
+        import psutil
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "memory_percent": psutil.virtual_memory().percent,
+            "disk_percent": psutil.disk_usage('/' if os.name != 'nt' else 'C:\\').percent,
+        }
+    except Exception:
+        return {"cpu_percent": None, "memory_percent": None, "disk_percent": None}
+
+
+class SystemMetricsSampler:
+    """Refreshes a system and database snapshot in a background task"""
+
+    def __init__(self, interval: float, timeout: float, engine=None, async_engine=None):
+        self.interval = interval
+        self.timeout = timeout
+        self.engine = engine
+        self.async_engine = async_engine
+        self._task: Optional[asyncio.Task] = None
+        # System figures are only collected once someone asks for /metrics
+        self.collect_system = False
+        # Set once the pools hold a connection and the database has answered
+        self.warmed_up = False
+        self._sampled_at_monotonic: Optional[float] = None
+        self.snapshot = {
+            "sampled_at": None,
+            "system": {"cpu_percent": None, "memory_percent": None, "disk_percent": None},
+            "database": {"status": "unknown", "error": None, "latency_ms": None, "pools": {}},
+        }
+
+    async def _check_database(self) -> dict:
+        async def ping():
+            async with self.async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(ping(), self.timeout)
+        except Exception as e:
+            return {"status": "disconnected", "error": str(e) or type(e).__name__, "latency_ms": None}
+        return {
+            "status": "connected",
+            "error": None,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    async def sample(self) -> dict:
+        """Take a new snapshot; psutil runs in a thread in case a disk stalls"""
+        if self.collect_system:
+            system, database = await asyncio.gather(
+                asyncio.to_thread(_system_stats), self._check_database()
+            )
+        else:
+            system, database = self.snapshot["system"], await self._check_database()
+        database["pools"] = {
+            "sync": _pool_stats(self.engine.pool),
+            "async": _pool_stats(self.async_engine.sync_engine.pool),
+        }
+        # Replaced whole, so readers never see a half-updated snapshot
+        self.snapshot = {
+            "sampled_at": datetime.utcnow().isoformat(),
+            "system": system,
+            "database": database,
+        }
+        self._sampled_at_monotonic = time.monotonic()
+        return self.snapshot
+
+    async def enable_system_stats(self) -> None:
+        """Start collecting CPU, memory and disk figures from now on"""
+        if self.collect_system:
+            return
+        self.collect_system = True
+        system = await asyncio.to_thread(_system_stats)
+        # The first cpu_percent(interval=None) call has no previous sample to compare with
+        system["cpu_percent"] = None
+        self.snapshot = {**self.snapshot, "system": system}
+
+    async def warm_up(self) -> None:
+        """Open a connection in each pool and take the first sample"""
+        def connect_sync():
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        try:
+            await asyncio.wait_for(asyncio.to_thread(connect_sync), self.timeout)
+        except Exception as e:
+            logger.warning(f"Database warm-up failed: {e}")
+            await self.sample()
+            return
+        if (await self.sample())["database"]["status"] == "connected":
+            self.warmed_up = True
+
+    def readiness(self) -> tuple:
+        """(ready, checks) from the latest sample and the pools' current usage"""
+        database = self.snapshot["database"]
+        age = (
+            time.monotonic() - self._sampled_at_monotonic
+            if self._sampled_at_monotonic is not None else None
+        )
+        fresh = age is not None and age <= self.interval * 3 + self.timeout
+        checks = {
+            "warmed_up": self.warmed_up,
+            "database": database["status"] if fresh else "stale",
+            "pools": {},
+        }
+        ready = self.warmed_up and fresh and database["status"] == "connected"
+        for name, pool in (("sync", self.engine.pool), ("async", self.async_engine.sync_engine.pool)):
+            stats = _pool_stats(pool)
+            if "checked_out" not in stats:
+                continue
+            capacity = stats["size"] + stats["max_overflow"]
+            usage = stats["checked_out"] / capacity if capacity else 0.0
+            saturated = usage >= settings.readiness_max_pool_usage
+            checks["pools"][name] = {"usage": round(usage, 2), "saturated": saturated}
+            ready = ready and not saturated
+        return ready, checks
+
+    async def _run(self):
+        while True:
+            try:
+                if (await self.sample())["database"]["status"] == "connected":
+                    self.warmed_up = True
+            except Exception:
+                logger.exception("System metrics sampling failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start sampling on the running event loop (idempotent)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+system_metrics_sampler = SystemMetricsSampler(
+    interval=settings.system_metrics_interval,
+    timeout=settings.db_check_timeout,
+    engine=engine,
+    async_engine=async_engine,
+)
@@ -0,0 +1,188 @@
+"""
+Table Version Tokens
+A token per table that changes after every commit writing to it, so read
+endpoints can answer conditional GETs without querying the database. The same
+commit hook invalidates the in-process caches built from those tables.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Callable, FrozenSet, Iterable, List, Optional, Tuple
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.cache import etag_matches
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process starts the tokens afresh
+    fcntl = None
+
+TRACKED_TABLES = ("users", "classes", "subjects", "grades", "absences", "events")
+
+_SLOT = struct.Struct("<Q")
+_WRITTEN_TABLES = "written_tables"
+
+_commit_listeners: List[Tuple[FrozenSet[str], Callable[[], None]]] = []
+
+
+def _new_token() -> int:
+    return int.from_bytes(os.urandom(8), "little")
+
+
+class TableVersions:
+    """Version tokens in a memory-mapped file shared by every worker of the host.
+
+    Workers map the same file whether a preloading gunicorn master forked them
+    or gunicorn and uvicorn started each one on its own. A bump writes a random
+    token rather than incrementing, so two workers bumping at once can not
+    land on a value a client already holds. Each process keeps a shared lock
+    on the file; the first to open it while no other holds one draws new
+    tokens, so ETags from before a restart never match.
+    """
+
+    def __init__(self, path: str, tables=TRACKED_TABLES):
+        self.path = path
+        self._slots = {table: i * _SLOT.size for i, table in enumerate(tables)}
+        self._size = len(tables) * _SLOT.size
+        self._mmap: Optional[mmap.mmap] = None
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _map(self) -> mmap.mmap:
+        if self._mmap is None:
+            with self._lock:
+                if self._mmap is None:
+                    self._open()
+        return self._mmap
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size < self._size:
+            os.ftruncate(fd, self._size)
+        mapped = mmap.mmap(fd, self._size)
+        if _lock_first(fd):
+            for offset in self._slots.values():
+                _SLOT.pack_into(mapped, offset, _new_token())
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+        # The descriptor stays open for as long as the process holds the lock
+        self._mmap, self._fd = mapped, fd
+
+    def get(self, *tables: str) -> str:
+        mapped = self._map()
+        return "-".join(f"{_SLOT.unpack_from(mapped, self._slots[t])[0]:x}" for t in tables)
+
+    def bump(self, tables: Iterable[str]) -> None:
+        mapped = self._map()
+        for table in tables:
+            offset = self._slots.get(table)
+            if offset is not None:
+                _SLOT.pack_into(mapped, offset, _new_token())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                os.close(self._fd)
+                self._mmap = self._fd = None
+
+
+def _lock_first(fd: int) -> bool:
+    """Lock ``fd``: exclusively if no other process has it open (True), else shared."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        return False
+
+
+def default_versions_path() -> str:
+    """A file per database, so every app process writing to it shares the tokens"""
+    digest = hashlib.sha256(settings.database_url.encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"pfc_table_versions_{digest}.bin")
+
+
+table_versions = TableVersions(settings.table_versions_path or default_versions_path())
+
+
+def on_commit(*tables: str):
+    """Decorator calling the function after each commit that wrote any of ``tables``.
+
+    Caches invalidate here rather than on flush: a flush is not visible to
+    other sessions yet, and may still be rolled back.
+    """
+    def register(callback: Callable[[], None]) -> Callable[[], None]:
+        _commit_listeners.append((frozenset(tables), callback))
+        return callback
+    return register
+
+
+def _record_tables(session: Session, tables: Iterable[str]) -> None:
+    session.info.setdefault(_WRITTEN_TABLES, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    """Remember the tables a flush wrote; they are bumped once the commit lands."""
+    _record_tables(session, {
+        obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    })
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_write_tables(orm_execute_state):
+    """Remember the table of a bulk INSERT/UPDATE/DELETE, which skips the flush."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _record_tables(orm_execute_state.session, {mapper.local_table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session):
+    # Bumped after the commit, so a reader never pairs old rows with a new token
+    tables = session.info.pop(_WRITTEN_TABLES, None)
+    if not tables:
+        return
+    table_versions.bump(tables)
+    for watched, callback in _commit_listeners:
+        if watched & tables:
+            callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_tables(session):
+    session.info.pop(_WRITTEN_TABLES, None)
+
+
+def versioned_etag(request: Request, tables: Iterable[str], scope: str) -> str:
+    """Weak ETag of a read over ``tables`` as seen by ``scope``.
+
+    The query string and Accept header are part of it, as they change the
+    representation.
+    """
+    key = "|".join((
+        request.url.path, table_versions.get(*tables), scope,
+        request.url.query, request.headers.get("accept", ""),
+    ))
+    return 'W/"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def not_modified(request: Request, response: Response, etag: str, cache_control: str) -> Optional[Response]:
+    """A 304 when ``If-None-Match`` matches ``etag``; else set the validators on ``response``."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
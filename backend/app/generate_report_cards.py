@@ -0,0 +1,56 @@
+"""
+Generate report cards for a whole class or the whole school.
+Writes a ZIP of per-student PDFs, or a single merged PDF:
+    python -m app.generate_report_cards all
+    python -m app.generate_report_cards 3 --format pdf --output class_3.pdf
+"""
+import argparse
+import sys
+from app.core.database import SessionLocal
+from app.core.pdf_generator import load_report_cards_data
+from app.core.report_batch import BATCH_FORMATS, run_report_card_batch
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Generate report cards in batch")
+    parser.add_argument("target", help='class id, or "all" for every student')
+    parser.add_argument("--format", choices=BATCH_FORMATS, default="zip")
+    parser.add_argument("--output", help="output file (default: report_cards_<target>.<format>)")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: one per core)")
+    args = parser.parse_args(argv)
+    
+    if args.target == "all":
+        class_id = None
+    elif args.target.isdigit():
+        class_id = int(args.target)
+    else:
+        parser.error('target must be a class id or "all"')
+    output = args.output or f"report_cards_{args.target}.{args.format}"
+    
+    db = SessionLocal()
+    try:
+        cards = load_report_cards_data(db, class_id)
+    finally:
+        db.close()
+    
+    if not cards:
+        print("ℹ️  No students found, nothing to generate")
+        return 0
+    
+    def on_progress(done: int, total: int) -> None:
+        print(f"\r📄 Rendered {done}/{total} report cards", end="", flush=True)
+    
+    try:
+        path = run_report_card_batch(
+            cards, output, output_format=args.format,
+            max_workers=args.workers, on_progress=on_progress
+        )
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        return 1
+    print(f"\n✅ Report cards written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
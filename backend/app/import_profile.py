@@ -0,0 +1,76 @@
+"""
+Profile what importing the application costs a worker.
+Imports a module in a fresh interpreter under -X importtime and reports the
+slowest imports, time per top-level package and resident memory afterwards:
+    python -m app.import_profile
+    python -m app.import_profile --module app.main --top 30
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Run in the child: import the module, then report peak RSS in KiB (Linux) or bytes (macOS)
+PROBE = """
+import importlib, resource, sys
+importlib.import_module(sys.argv[1])
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(rss // 1024 if sys.platform == "darwin" else rss)
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self us, cumulative us, depth) for each -X importtime line"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def profile(module: str) -> tuple:
+    """Import ``module`` in a child interpreter; returns (entries, peak RSS in KiB)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, module],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr), int(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time and memory profile of the app")
+    parser.add_argument("--module", default="app.main", help="module to import (default: app.main)")
+    parser.add_argument("--top", type=int, default=20, help="rows per table (default: 20)")
+    args = parser.parse_args(argv)
+
+    try:
+        entries, rss_kib = profile(args.module)
+    except RuntimeError as e:
+        print(f"❌ Import failed: {e}")
+        return 1
+
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    packages = defaultdict(int)
+    for name, self_us, _, _ in entries:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"📦 {args.module}: {len(entries)} modules, {total_us / 1000:.1f} ms, peak RSS {rss_kib / 1024:.1f} MiB")
+    print("\nSlowest imports (cumulative):")
+    for name, _, cumulative, _ in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+    print("\nTime per top-level package (self):")
+    for name, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
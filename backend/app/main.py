@@ -1,11 +1,16 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from app.core.config import settings
-from app.core.database import init_db
+from app.core.database import ensure_schema
+from starlette.concurrency import run_in_threadpool
 from app.core.monitoring import MonitoringMiddleware, initialize_sentry
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.security import password_hash_pool
+from app.core.report_cards import report_card_renderer
+from app.core.system_metrics import system_metrics_sampler
+from app.core.refresh_tokens import refresh_token_purger
 from app.routers import auth, users, classes, subjects, grades, absences, events, reports, statistics, metrics
 import logging
 
@@ -16,29 +21,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize database (imports all models and creates tables)
-try:
-    init_db()
-except Exception as e:
-    logger.error(f"Failed to initialize database: {e}")
-    raise
-
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
-
 app = FastAPI(
     title="School Records Management System API",
     description="API for managing student academic records",
     version="1.0.0"
 )
 
-# Add rate limiter to app state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Rate limiting (innermost, so monitoring records rejected requests)
+app.add_middleware(RateLimitMiddleware)
 
 # Monitoring middleware (add before CORS)
 app.add_middleware(MonitoringMiddleware, enable_logging=True)
 
+# Compress responses the client accepts compressed (inside CORS)
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -68,9 +65,21 @@ async def startup_event():
     logger.info(f"📡 API prefix: {settings.api_v1_prefix}")
     logger.info(f"🌐 CORS origins: {settings.cors_origins}")
     
+    # Create/verify tables unless the preloading gunicorn master already did
+    try:
+        await run_in_threadpool(ensure_schema)
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        raise
+    
     # Initialize optional Sentry integration
     initialize_sentry()
     
+    # Take no traffic (readiness) until the pools hold a connection
+    await system_metrics_sampler.warm_up()
+    system_metrics_sampler.start()
+    refresh_token_purger.start()
+    
     print("\n" + "="*50)
     print("🚀 School Records Management System API")
     print("="*50)
@@ -80,6 +89,15 @@ async def startup_event():
     print("="*50 + "\n")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the background jobs and release the password hashing and report rendering workers."""
+    await system_metrics_sampler.stop()
+    await refresh_token_purger.stop()
+    password_hash_pool.shutdown()
+    report_card_renderer.shutdown()
+
+
 @app.get("/")
 def root():
     return {
@@ -92,20 +110,24 @@ def root():
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint."""
-    try:
-        from app.core.database import engine
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            result.fetchone()
-        return {
-            "status": "healthy",
-            "database": "connected"
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e)
-        }
+    """Health check endpoint (liveness plus the last sampled database status)."""
+    return {
+        "status": "healthy",
+        "database": system_metrics_sampler.snapshot["database"]["status"],
+    }
+
+
+@app.get("/health/live")
+def liveness_probe():
+    """Liveness probe: the process is serving requests; no I/O."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+def readiness_probe():
+    """Readiness probe: warmed up, database reachable at the last sample, pools not saturated."""
+    ready, checks = system_metrics_sampler.readiness()
+    return JSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks},
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
@@ -4,6 +4,7 @@ from .subject import Subject
 from .grade import Grade
 from .absence import Absence
 from .event import Event
+from .refresh_token import RefreshToken
 
-__all__ = ["User", "UserRole", "Class", "Subject", "Grade", "Absence", "Event"]
+__all__ = ["User", "UserRole", "Class", "Subject", "Grade", "Absence", "Event", "RefreshToken"]
 
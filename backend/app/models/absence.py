@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -11,6 +11,11 @@ class Absence(Base):
     date = Column(Date, nullable=False)
     reason = Column(String(500), nullable=True)
 
+    # Absence lists filter by student and show the most recent first
+    __table_args__ = (
+        Index("ix_absences_student_date", student_id, date.desc()),
+    )
+
     # Relationships
     student = relationship("User", back_populates="absences")
 
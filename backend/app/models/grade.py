@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -13,6 +13,12 @@ class Grade(Base):
     grade = Column(Float, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Students' own grades filter by student, teachers' views by subject
+    __table_args__ = (
+        Index("ix_grades_student_subject", "student_id", "subject_id"),
+        Index("ix_grades_subject_student", "subject_id", "student_id"),
+    )
+
     # Relationships
     student = relationship("User", back_populates="grades")
     subject = relationship("Subject", back_populates="grades")
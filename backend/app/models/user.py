@@ -24,4 +24,5 @@ class User(Base):
     classes = relationship("Class", back_populates="teacher")
     grades = relationship("Grade", back_populates="student")
     absences = relationship("Absence", back_populates="student")
+    refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
 
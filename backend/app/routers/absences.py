@@ -1,52 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User, UserRole
 from app.models.absence import Absence
-from app.models.class_model import Class
-from app.models.subject import Subject
-from app.models.grade import Grade
 from app.schemas.absence import AbsenceResponse, AbsenceCreate, AbsenceUpdate
 from app.core.security import get_current_user, require_role
+from app.core.scope import resolve_teacher_scope_async
+from app.core.query_options import IncludedRelations, RelationIncludes
+from app.core.serialization import list_response
 
 router = APIRouter()
 
+absence_includes = RelationIncludes(student=Absence.student)
+
 
 @router.get("/", response_model=List[AbsenceResponse])
-def get_absences(
+async def get_absences(
+    request: Request,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    relations: IncludedRelations = Depends(absence_includes),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get absences, filtered by role permissions."""
-    query = db.query(Absence)
+    """Get absences, filtered by role permissions; ``include=student`` embeds the student."""
+    query = select(Absence).options(*relations.options)
     
     if current_user.role == UserRole.STUDENT:
-        query = query.filter(Absence.student_id == current_user.id)
+        query = query.where(Absence.student_id == current_user.id)
     elif current_user.role == UserRole.TEACHER:
-        teacher_classes = db.query(Class).filter(Class.teacher_id == current_user.id).all()
-        class_ids = [c.id for c in teacher_classes]
-        teacher_subjects = db.query(Subject).filter(Subject.class_id.in_(class_ids)).all()
-        subject_ids = [s.id for s in teacher_subjects]
-        student_ids = db.query(Grade.student_id).filter(Grade.subject_id.in_(subject_ids)).distinct().all()
-        student_ids = [s[0] for s in student_ids]
-        query = query.filter(Absence.student_id.in_(student_ids))
+        scope = await resolve_teacher_scope_async(db, current_user.id)
+        query = query.where(Absence.student_id.in_(scope.student_ids))
     
     if student_id:
-        query = query.filter(Absence.student_id == student_id)
+        query = query.where(Absence.student_id == student_id)
     
-    return query.order_by(Absence.date.desc()).all()
+    absences = relations.serializable((await db.scalars(query.order_by(Absence.date.desc()))).unique())
+    return list_response(request, absences, AbsenceResponse)
 
 
 @router.get("/{absence_id}", response_model=AbsenceResponse)
-def get_absence(
+async def get_absence(
     absence_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get absence by ID."""
-    absence = db.query(Absence).filter(Absence.id == absence_id).first()
+    absence = await db.get(Absence, absence_id, options=[joinedload(Absence.student)])
     if not absence:
         raise HTTPException(status_code=404, detail="Absence not found")
     
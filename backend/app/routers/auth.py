@@ -1,33 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User
 from app.schemas.user import LoginRequest, TokenResponse, UserCreate, UserResponse, RefreshTokenRequest
 from app.core.security import (
-    verify_password, get_password_hash,
+    get_password_hash_async, verify_and_update_password_async,
     create_access_token, create_refresh_token, verify_token,
-    get_current_user
+    get_current_user, invalidate_cached_user
 )
+from app.core.config import settings
+from app.core.rate_limit import enforce_login_rate_limits
+from app.core.refresh_tokens import hash_refresh_token, is_known_revoked, remember_revoked
+from app.models.refresh_token import RefreshToken
 from datetime import datetime, timedelta
-import hashlib
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 
 
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     new_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -35,31 +37,42 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role=user_data.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @router.post("/login", response_model=TokenResponse)
-@limiter.limit("5/minute")
-def login(request: Request, credentials: LoginRequest, db: Session = Depends(get_db)):
-    """Login and get access/refresh tokens with token rotation."""
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, user.password):
+async def login(
+    credentials: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)
+):
+    """Login and get access/refresh tokens with token rotation.
+
+    Attempts are limited per account and address, and per address, so a class
+    signing in from one school address does not share one small budget. Hashes
+    made with outdated bcrypt parameters are replaced on success.
+    """
+    await enforce_login_rate_limits(request.scope, credentials.email)
+    user = await db.scalar(select(User).where(User.email == credentials.email))
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_and_update_password_async(
+            credentials.password, user.password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
+    if new_hash:
+        user.password = new_hash
     
-    # Create tokens
-    access_token = create_access_token(data={"sub": user.id, "role": user.role.value})
-    refresh_token = create_refresh_token(data={"sub": user.id})
+    # Create tokens (JWT requires sub to be a string)
+    access_token = create_access_token(data={"sub": str(user.id), "role": user.role.value})
+    refresh_token = create_refresh_token(data={"sub": str(user.id)})
     
     # Store refresh token hash in database
-    from app.models.refresh_token import RefreshToken
-    from app.core.config import settings
-    
-    token_hash = hashlib.sha256(refresh_token.encode()).hexdigest()
+    token_hash = hash_refresh_token(refresh_token)
     expires_at = datetime.utcnow() + timedelta(days=settings.jwt_refresh_expire_days)
     
     db_token = RefreshToken(
@@ -68,7 +81,7 @@ def login(request: Request, credentials: LoginRequest, db: Session = Depends(get
         expires_at=expires_at
     )
     db.add(db_token)
-    db.commit()
+    await db.commit()
     
     return TokenResponse(
         access_token=access_token,
@@ -80,15 +93,19 @@ def login(request: Request, credentials: LoginRequest, db: Session = Depends(get
 @router.post("/refresh", response_model=TokenResponse)
 def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
     """Refresh access token with token rotation and revocation."""
-    from app.models.refresh_token import RefreshToken
-    from app.core.config import settings
-    
     # Verify token signature and expiration
     payload = verify_token(request.refresh_token, token_type="refresh")
-    user_id = payload.get("sub")
+    user_id = int(payload.get("sub"))
     
     # Hash the provided token
-    token_hash = hashlib.sha256(request.refresh_token.encode()).hexdigest()
+    token_hash = hash_refresh_token(request.refresh_token)
+    
+    # Replays of tokens this worker already revoked need no lookup
+    if is_known_revoked(token_hash):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or revoked refresh token"
+        )
     
     # Check if token exists in database and is not revoked
     db_token = db.query(RefreshToken).filter(
@@ -108,6 +125,7 @@ def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
         db_token.revoked = True
         db_token.revoked_at = datetime.utcnow()
         db.commit()
+        remember_revoked([token_hash])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Refresh token expired"
@@ -126,11 +144,11 @@ def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
     db_token.revoked_at = datetime.utcnow()
     
     # Create new tokens
-    access_token = create_access_token(data={"sub": user.id, "role": user.role.value})
-    new_refresh_token = create_refresh_token(data={"sub": user.id})
+    access_token = create_access_token(data={"sub": str(user.id), "role": user.role.value})
+    new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
     
     # Store new refresh token
-    new_token_hash = hashlib.sha256(new_refresh_token.encode()).hexdigest()
+    new_token_hash = hash_refresh_token(new_refresh_token)
     expires_at = datetime.utcnow() + timedelta(days=settings.jwt_refresh_expire_days)
     
     new_db_token = RefreshToken(
@@ -140,6 +158,7 @@ def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
     )
     db.add(new_db_token)
     db.commit()
+    remember_revoked([token_hash])
     
     return TokenResponse(
         access_token=access_token,
@@ -154,7 +173,10 @@ def logout(
     db: Session = Depends(get_db)
 ):
     """Logout and revoke all refresh tokens for the user."""
-    from app.models.refresh_token import RefreshToken
+    active = db.query(RefreshToken.token_hash).filter(
+        RefreshToken.user_id == current_user.id,
+        RefreshToken.revoked == False
+    ).all()
     
     # Revoke all active refresh tokens for this user
     db.query(RefreshToken).filter(
@@ -165,6 +187,8 @@ def logout(
         "revoked_at": datetime.utcnow()
     })
     db.commit()
+    remember_revoked(token_hash for token_hash, in active)
+    invalidate_cached_user(current_user.id)
     
     return {
         "message": "Successfully logged out",
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
@@ -6,20 +6,41 @@ from app.models.user import User, UserRole
 from app.models.class_model import Class
 from app.schemas.class_model import ClassResponse, ClassCreate, ClassUpdate
 from app.core.security import get_current_user, require_role
+from app.core.query_options import IncludedRelations, RelationIncludes
+from app.core.serialization import list_response
+from app.core.table_versions import not_modified, versioned_etag
 
 router = APIRouter()
 
+class_includes = RelationIncludes(teacher=Class.teacher)
+
+# Classes change a few times a year; clients revalidate after five minutes
+CACHE_CONTROL = "private, max-age=300"
+
 
 @router.get("/", response_model=List[ClassResponse])
 def get_classes(
+    request: Request,
+    response: Response,
+    relations: IncludedRelations = Depends(class_includes),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all classes."""
-    query = db.query(Class)
+    """Get all classes; ``include=teacher`` embeds the teacher.
+
+    Served with a weak ``ETag`` over the classes table version; a matching
+    ``If-None-Match`` gets ``304 Not Modified`` without a query.
+    """
+    tables = ("classes", "users") if "teacher" in relations.names else ("classes",)
+    scope = f"teacher:{current_user.id}" if current_user.role == UserRole.TEACHER else "all"
+    etag = versioned_etag(request, tables, scope)
+    unchanged = not_modified(request, response, etag, CACHE_CONTROL)
+    if unchanged is not None:
+        return unchanged
+    query = db.query(Class).options(*relations.options)
     if current_user.role == UserRole.TEACHER:
         query = query.filter(Class.teacher_id == current_user.id)
-    return query.all()
+    return list_response(request, relations.serializable(query.all()), ClassResponse, response)
 
 
 @router.get("/{class_id}", response_model=ClassResponse)
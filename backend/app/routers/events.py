@@ -1,42 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User, UserRole
 from app.models.event import Event
 from app.schemas.event import EventResponse, EventCreate, EventUpdate
 from app.core.security import get_current_user, require_role
+from app.core.serialization import list_response
+from app.core.table_versions import not_modified, versioned_etag
 
 router = APIRouter()
 
+# Events are announced during the week; always revalidate, which is a cheap 304
+CACHE_CONTROL = "private, no-cache"
+
 
 @router.get("/", response_model=List[EventResponse])
-def get_events(
+async def get_events(
+    request: Request,
+    response: Response,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get events, optionally filtered by date range."""
-    query = db.query(Event)
+    """Get events, optionally filtered by date range.
+
+    Served with a weak ``ETag`` over the events table version; a matching
+    ``If-None-Match`` gets ``304 Not Modified`` without a query.
+    """
+    etag = versioned_etag(request, ("events",), "all")
+    unchanged = not_modified(request, response, etag, CACHE_CONTROL)
+    if unchanged is not None:
+        return unchanged
+    query = select(Event)
     
     if start_date:
-        query = query.filter(Event.date >= start_date)
+        query = query.where(Event.date >= start_date)
     if end_date:
-        query = query.filter(Event.date <= end_date)
+        query = query.where(Event.date <= end_date)
     
-    return query.order_by(Event.date.asc()).all()
+    events = (await db.scalars(query.order_by(Event.date.asc()))).all()
+    return list_response(request, events, EventResponse, response)
 
 
 @router.get("/{event_id}", response_model=EventResponse)
-def get_event(
+async def get_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get event by ID."""
-    event = db.query(Event).filter(Event.id == event_id).first()
+    event = await db.get(Event, event_id)
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     return event
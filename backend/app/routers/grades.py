@@ -1,52 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User, UserRole
 from app.models.grade import Grade
-from app.models.class_model import Class
 from app.models.subject import Subject
-from app.schemas.grade import GradeResponse, GradeCreate, GradeUpdate
+from app.schemas.grade import (
+    GradeResponse, GradeCreate, GradeUpdate, GradeBulkCreate, GradeBulkError, GradeBulkResponse
+)
 from app.core.security import get_current_user, require_role
+from app.core.scope import resolve_teacher_scope_async
+from app.core.query_options import IncludedRelations, RelationIncludes
+from app.core.serialization import list_response
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, resolve_after_id
+)
 
 router = APIRouter()
 
+STREAM_BATCH_SIZE = 500
+
+grade_includes = RelationIncludes(student=Grade.student, subject=Grade.subject)
+
 
 @router.get("/", response_model=List[GradeResponse])
-def get_grades(
+async def get_grades(
+    request: Request,
+    response: Response,
     student_id: Optional[int] = None,
     subject_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    after_id: Optional[int] = Query(None, ge=0),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    stream: Optional[str] = Query(None, pattern="^ndjson$"),
+    relations: IncludedRelations = Depends(grade_includes),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get grades, filtered by role permissions."""
-    query = db.query(Grade)
+    """Get grades, filtered by role permissions.
+
+    Passing ``limit``, ``after_id`` or ``cursor`` switches to keyset pagination
+    ordered by id; the next page cursor is returned in ``X-Next-Cursor``.
+    ``stream=ndjson`` streams one grade per line from a server-side cursor.
+    Nested ``student``/``subject`` are only loaded when named in ``include``.
+    """
+    query = select(Grade)
     
     if current_user.role == UserRole.STUDENT:
-        query = query.filter(Grade.student_id == current_user.id)
+        query = query.where(Grade.student_id == current_user.id)
     elif current_user.role == UserRole.TEACHER:
-        teacher_classes = db.query(Class).filter(Class.teacher_id == current_user.id).all()
-        class_ids = [c.id for c in teacher_classes]
-        teacher_subjects = db.query(Subject).filter(Subject.class_id.in_(class_ids)).all()
-        subject_ids = [s.id for s in teacher_subjects]
-        query = query.filter(Grade.subject_id.in_(subject_ids))
+        scope = await resolve_teacher_scope_async(db, current_user.id)
+        query = query.where(Grade.subject_id.in_(scope.subject_ids))
     
     if student_id:
-        query = query.filter(Grade.student_id == student_id)
+        query = query.where(Grade.student_id == student_id)
     if subject_id:
-        query = query.filter(Grade.subject_id == subject_id)
+        query = query.where(Grade.subject_id == subject_id)
+    
+    position = resolve_after_id(cursor, after_id)
+    if position is not None:
+        query = query.where(Grade.id > position)
+    
+    if stream:
+        if limit:
+            query = query.order_by(Grade.id).limit(limit)
+        return _stream_grades_ndjson(query, db)
+    
+    query = query.options(*relations.options)
     
-    return query.all()
+    if position is None and limit is None:
+        grades = relations.serializable((await db.scalars(query)).unique())
+        return list_response(request, grades, GradeResponse)
+    
+    page_size = limit or DEFAULT_PAGE_SIZE
+    grades = (await db.scalars(query.order_by(Grade.id).limit(page_size))).unique().all()
+    if len(grades) == page_size:
+        response.headers["X-Next-Cursor"] = encode_cursor(grades[-1].id)
+    return list_response(request, relations.serializable(grades), GradeResponse, response)
+
+
+def _stream_grades_ndjson(query, db: AsyncSession) -> StreamingResponse:
+    """Stream flat grade rows as NDJSON without materializing the result set."""
+    rows = query.with_only_columns(
+        Grade.id, Grade.student_id, Grade.subject_id, Grade.grade, Grade.created_at
+    ).order_by(Grade.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+    
+    async def generate():
+        try:
+            result = await db.stream(rows)
+            async for partition in result.partitions():
+                yield "".join(
+                    GradeResponse.model_validate(row).model_dump_json() + "\n"
+                    for row in partition
+                )
+        finally:
+            # The request-scoped session may already be closed by get_async_db;
+            # make sure the server-side cursor's connection is released either way.
+            await db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.get("/{grade_id}", response_model=GradeResponse)
-def get_grade(
+async def get_grade(
     grade_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get grade by ID."""
-    grade = db.query(Grade).filter(Grade.id == grade_id).first()
+    grade = await db.get(
+        Grade, grade_id, options=[joinedload(Grade.student), joinedload(Grade.subject)]
+    )
     if not grade:
         raise HTTPException(status_code=404, detail="Grade not found")
     
@@ -88,6 +155,56 @@ def create_grade(
     return new_grade
 
 
+@router.post("/bulk", response_model=GradeBulkResponse)
+def create_grades_bulk(
+    payload: GradeBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.TEACHER]))
+):
+    """Create many grades in one transaction.
+
+    Student and subject ids are checked with one query each and valid rows are
+    written with a single multi-row INSERT. Invalid rows are reported in
+    ``errors`` and skipped, unless ``atomic`` is set, in which case any error
+    rejects the whole batch with 400.
+    """
+    student_ids = {row.student_id for row in payload.grades}
+    subject_ids = {row.subject_id for row in payload.grades}
+    
+    known_students = {
+        student_id for (student_id,) in db.query(User.id).filter(
+            User.id.in_(student_ids),
+            User.role == UserRole.STUDENT
+        )
+    }
+    known_subjects = {
+        subject_id for (subject_id,) in db.query(Subject.id).filter(Subject.id.in_(subject_ids))
+    }
+    
+    rows = []
+    errors = []
+    for index, row in enumerate(payload.grades):
+        if row.student_id not in known_students:
+            errors.append(GradeBulkError(index=index, detail="Student not found"))
+        elif row.subject_id not in known_subjects:
+            errors.append(GradeBulkError(index=index, detail="Subject not found"))
+        elif row.grade < 0 or row.grade > 20:
+            errors.append(GradeBulkError(index=index, detail="Grade must be between 0 and 20"))
+        else:
+            rows.append(row.model_dump())
+    
+    if errors and payload.atomic:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[error.model_dump() for error in errors]
+        )
+    
+    if rows:
+        db.execute(insert(Grade), rows)
+        db.commit()
+    return GradeBulkResponse(created=len(rows), errors=errors)
+
+
 @router.put("/{grade_id}", response_model=GradeResponse)
 def update_grade(
     grade_id: int,
@@ -2,80 +2,66 @@
 Metrics and Monitoring Endpoints
 Provides system health and performance metrics
 """
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.core.database import get_db
-from app.core.monitoring import get_metrics
-import psutil
-import os
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.monitoring import get_metrics, metrics_store
+from app.core.system_metrics import system_metrics_sampler
 
 router = APIRouter(prefix="/metrics", tags=["Monitoring"])
 
 
 @router.get("", summary="Get system metrics")
-async def get_system_metrics(db: Session = Depends(get_db)):
+async def get_system_metrics():
     """
     Get comprehensive system metrics including:
     - Application uptime
     - Request statistics
-    - Database status
-    - System resources (CPU, Memory)
-    """
-    # Get application metrics
-    app_metrics = get_metrics()
-    
-    # Check database status
-    db_status = "connected"
-    db_error = None
-    try:
-        db.execute(text("SELECT 1"))
-    except Exception as e:
-        db_status = "disconnected"
-        db_error = str(e)
+    - Database status and connection pools
+    - System resources (CPU, Memory, Disk)
     
-    # Get system resources (if psutil is available)
-    system_metrics = {}
-    try:
-        system_metrics = {
-            "cpu_percent": psutil.cpu_percent(interval=0.1),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_percent": psutil.disk_usage('/').percent if os.name != 'nt' else psutil.disk_usage('C:\\').percent,
-        }
-    except (ImportError, Exception):
-        # psutil not available or error
-        system_metrics = {
-            "cpu_percent": None,
-            "memory_percent": None,
-            "disk_percent": None,
-        }
+    Database and system figures come from the background sampler's latest
+    snapshot (``sampled_at``), so a scrape does no blocking I/O. System
+    figures are collected from the first scrape on.
+    """
+    await system_metrics_sampler.enable_system_stats()
+    snapshot = system_metrics_sampler.snapshot
+    database = snapshot["database"]
     
     return {
-        "status": "healthy" if db_status == "connected" else "degraded",
-        "application": app_metrics,
-        "database": {
-            "status": db_status,
-            "error": db_error,
-        },
-        "system": system_metrics,
+        "status": "healthy" if database["status"] == "connected" else "degraded",
+        "application": get_metrics(),
+        "database": database,
+        "system": snapshot["system"],
+        "sampled_at": snapshot["sampled_at"],
     }
 
 
+@router.get("/prometheus", summary="Get metrics in Prometheus format", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Request latency histograms (by route template, method and status class),
+    SQL statement counters and process gauges in the Prometheus text format
+    """
+    return PlainTextResponse(
+        metrics_store.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @router.get("/health", summary="Simple health check")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check():
     """
     Simple health check endpoint for load balancers and monitoring tools
-    Returns 200 OK if the application and database are operational
+    Reports the database status from the background sampler's latest check
     """
-    try:
-        db.execute(text("SELECT 1"))
+    database = system_metrics_sampler.snapshot["database"]
+    if database["status"] == "connected":
         return {
             "status": "healthy",
             "database": "connected",
         }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "database": "disconnected",
-            "error": str(e),
-        }
+    return {
+        "status": "unhealthy",
+        "database": database["status"],
+        "error": database["error"],
+    }
@@ -1,34 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
 from sqlalchemy.orm import Session
+import uuid
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User, UserRole
-from app.core.security import get_current_user
-from app.core.pdf_generator import generate_report_card
+from app.core.security import get_current_user, require_role
+from app.core.cache import etag_matches
+from app.core.pdf_generator import load_report_card_data
+from app.core.report_cards import report_card_renderer
+from app.core.report_batch import BatchJobStore
+from app.core.scope import resolve_teacher_scope
+from app.schemas.report import ReportBatchCreate, ReportBatchStatus
 
 router = APIRouter()
 
+batch_jobs = BatchJobStore(settings.report_batch_dir)
+
+JOB_ID_PATTERN = "^[0-9a-f]{32}$"
+
 
 @router.get("/report-card/{student_id}")
-def get_report_card(
+async def get_report_card(
     student_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Generate and download PDF report card for a student."""
+    """Generate and download PDF report card for a student.
+
+    Cards are cached by a hash of their content, which is also the ``ETag``;
+    unchanged cards are served from the cache or answered with ``304``.
+    """
     if current_user.role == UserRole.STUDENT:
         if current_user.id != student_id:
             raise HTTPException(status_code=403, detail="Not authorized to view this report")
     
     try:
-        pdf_buffer = generate_report_card(student_id, db)
-        return Response(
-            content=pdf_buffer.read(),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename=report_card_{student_id}.pdf"
-            }
-        )
+        data = await run_in_threadpool(load_report_card_data, student_id, db)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    
+    key = data.content_hash()
+    headers = {
+        "ETag": f'"{key}"',
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"attachment; filename=report_card_{student_id}.pdf"
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    pdf = await report_card_renderer.render(data, key)
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
 
+
+@router.post("/batch", response_model=ReportBatchStatus, status_code=status.HTTP_202_ACCEPTED)
+def start_report_card_batch(
+    payload: ReportBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.TEACHER]))
+):
+    """Start rendering report cards for a class, or ``"all"`` students (admin only).
+
+    Loading and rendering run in the background. Poll ``/batch/{job_id}`` for
+    progress and fetch the result from its download URL.
+    """
+    class_id = None if payload.class_id == "all" else payload.class_id
+    if current_user.role == UserRole.TEACHER:
+        if class_id is None or class_id not in resolve_teacher_scope(db, current_user.id).class_ids:
+            raise HTTPException(status_code=403, detail="Not authorized for this class")
+    
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "owner_id": current_user.id,
+        "status": "pending",
+        "class_id": payload.class_id,
+        "format": payload.format,
+        "total": 0,
+        "completed": 0,
+        "error": None,
+    }
+    batch_jobs.save(job)
+    background_tasks.add_task(batch_jobs.run, job)
+    return job
+
+
+def _get_batch_job(job_id: str, current_user: User) -> dict:
+    job = batch_jobs.load(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    if current_user.role != UserRole.ADMIN and job["owner_id"] != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return job
+
+
+@router.get("/batch/{job_id}", response_model=ReportBatchStatus)
+def get_report_card_batch(
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.TEACHER]))
+):
+    """Get the progress of a batch report card job."""
+    return _get_batch_job(job_id, current_user)
+
+
+@router.get("/batch/{job_id}/download")
+def download_report_card_batch(
+    job_id: str = Path(..., pattern=JOB_ID_PATTERN),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.TEACHER]))
+):
+    """Download the ZIP or merged PDF of a completed batch job."""
+    job = _get_batch_job(job_id, current_user)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Batch job is {job['status']}")
+    
+    output_format = job["format"]
+    return FileResponse(
+        batch_jobs.output_path(job_id, output_format),
+        media_type="application/zip" if output_format == "zip" else "application/pdf",
+        filename=f"report_cards_{job['class_id']}.{output_format}"
+    )
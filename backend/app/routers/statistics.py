@@ -1,66 +1,128 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select
 from typing import Optional
-from app.core.database import get_db
+import math
+from app.core.config import settings
+from app.core.database import get_async_db
 from app.models.user import User, UserRole
 from app.models.grade import Grade
 from app.models.absence import Absence
 from app.models.class_model import Class
 from app.models.subject import Subject
 from app.core.security import get_current_user
+from app.core.scope import resolve_teacher_scope_async
+from app.core.cache import TTLCache, compute_etag, etag_matches
+from app.core.table_versions import on_commit
 
 router = APIRouter()
 
+MAX_GRADE = 20.0
+
+# School-wide counters are the same for every admin, so one entry suffices
+ADMIN_DASHBOARD_KEY = "admin"
+dashboard_cache = TTLCache(ttl_seconds=settings.dashboard_cache_ttl, max_entries=1)
+
+
+@on_commit(
+    User.__tablename__, Class.__tablename__, Subject.__tablename__,
+    Grade.__tablename__, Absence.__tablename__,
+)
+def _invalidate_dashboard_on_commit():
+    """Drop the cached admin dashboard once a commit touching a counted table lands."""
+    dashboard_cache.clear()
+
+
+async def _admin_dashboard_stats(db: AsyncSession) -> dict:
+    """Compute every admin counter in a single round-trip using scalar subqueries."""
+    result = await db.execute(select(
+        select(func.count(User.id)).scalar_subquery().label("total_users"),
+        select(func.count(User.id)).where(
+            User.role == UserRole.STUDENT
+        ).scalar_subquery().label("total_students"),
+        select(func.count(User.id)).where(
+            User.role == UserRole.TEACHER
+        ).scalar_subquery().label("total_teachers"),
+        select(func.count(Class.id)).scalar_subquery().label("total_classes"),
+        select(func.count(Subject.id)).scalar_subquery().label("total_subjects"),
+        select(func.count(Grade.id)).scalar_subquery().label("total_grades"),
+        select(func.avg(Grade.grade)).scalar_subquery().label("average_grade"),
+        select(func.count(Absence.id)).scalar_subquery().label("total_absences"),
+    ))
+    row = result.one()
+    
+    stats = dict(row._mapping)
+    stats["average_grade"] = float(stats["average_grade"]) if stats["average_grade"] else 0
+    return stats
+
 
 @router.get("/dashboard")
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
+async def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get dashboard statistics based on user role."""
+    """Get dashboard statistics based on user role.
+
+    The admin counters are cached for ``DASHBOARD_CACHE_TTL`` seconds and served
+    with an ``ETag``; a matching ``If-None-Match`` gets ``304 Not Modified``.
+    """
     stats = {}
     
     if current_user.role == UserRole.ADMIN:
-        stats["total_users"] = db.query(func.count(User.id)).scalar()
-        stats["total_students"] = db.query(func.count(User.id)).filter(User.role == UserRole.STUDENT).scalar()
-        stats["total_teachers"] = db.query(func.count(User.id)).filter(User.role == UserRole.TEACHER).scalar()
-        stats["total_classes"] = db.query(func.count(Class.id)).scalar()
-        stats["total_subjects"] = db.query(func.count(Subject.id)).scalar()
-        stats["total_grades"] = db.query(func.count(Grade.id)).scalar()
-        stats["average_grade"] = db.query(func.avg(Grade.grade)).scalar() or 0
-        stats["total_absences"] = db.query(func.count(Absence.id)).scalar()
+        cached = dashboard_cache.get(ADMIN_DASHBOARD_KEY)
+        if cached is None:
+            stats = await _admin_dashboard_stats(db)
+            cached = (stats, compute_etag(stats))
+            dashboard_cache.set(ADMIN_DASHBOARD_KEY, cached)
+        stats, etag = cached
+        
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={settings.dashboard_cache_ttl}",
+        }
+        if etag_matches(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return stats
         
     elif current_user.role == UserRole.TEACHER:
-        teacher_classes = db.query(Class).filter(Class.teacher_id == current_user.id).all()
-        class_ids = [c.id for c in teacher_classes]
-        teacher_subjects = db.query(Subject).filter(Subject.class_id.in_(class_ids)).all()
-        subject_ids = [s.id for s in teacher_subjects]
+        scope = await resolve_teacher_scope_async(db, current_user.id)
         
-        stats["total_classes"] = len(teacher_classes)
-        stats["total_subjects"] = len(teacher_subjects)
-        stats["total_grades"] = db.query(func.count(Grade.id)).filter(Grade.subject_id.in_(subject_ids)).scalar()
-        avg_grade = db.query(func.avg(Grade.grade)).filter(Grade.subject_id.in_(subject_ids)).scalar()
+        stats["total_classes"] = len(scope.class_ids)
+        stats["total_subjects"] = len(scope.subject_ids)
+        result = await db.execute(select(
+            func.count(Grade.id), func.avg(Grade.grade)
+        ).where(Grade.subject_id.in_(scope.subject_ids)))
+        total_grades, avg_grade = result.one()
+        stats["total_grades"] = total_grades
         stats["average_grade"] = float(avg_grade) if avg_grade else 0
         
-        student_ids = db.query(Grade.student_id).filter(Grade.subject_id.in_(subject_ids)).distinct().all()
-        student_ids = [s[0] for s in student_ids]
-        stats["total_students"] = len(student_ids)
-        stats["total_absences"] = db.query(func.count(Absence.id)).filter(Absence.student_id.in_(student_ids)).scalar()
+        stats["total_students"] = len(scope.student_ids)
+        stats["total_absences"] = await db.scalar(
+            select(func.count(Absence.id)).where(Absence.student_id.in_(scope.student_ids))
+        )
         
     elif current_user.role == UserRole.STUDENT:
-        stats["total_grades"] = db.query(func.count(Grade.id)).filter(Grade.student_id == current_user.id).scalar()
-        avg_grade = db.query(func.avg(Grade.grade)).filter(Grade.student_id == current_user.id).scalar()
+        stats["total_grades"] = await db.scalar(
+            select(func.count(Grade.id)).where(Grade.student_id == current_user.id)
+        )
+        avg_grade = await db.scalar(
+            select(func.avg(Grade.grade)).where(Grade.student_id == current_user.id)
+        )
         stats["average_grade"] = float(avg_grade) if avg_grade else 0
-        stats["total_absences"] = db.query(func.count(Absence.id)).filter(Absence.student_id == current_user.id).scalar()
+        stats["total_absences"] = await db.scalar(
+            select(func.count(Absence.id)).where(Absence.student_id == current_user.id)
+        )
         
-        grades_by_subject = db.query(
+        grades_by_subject = (await db.execute(select(
             Subject.name,
             func.avg(Grade.grade).label('avg_grade'),
             func.count(Grade.id).label('count')
-        ).join(Grade).filter(
+        ).join(Grade).where(
             Grade.student_id == current_user.id
-        ).group_by(Subject.id, Subject.name).all()
+        ).group_by(Subject.id, Subject.name))).all()
         
         stats["grades_by_subject"] = [
             {"subject": name, "average": float(avg), "count": count}
@@ -71,31 +133,66 @@ def get_dashboard_stats(
 
 
 @router.get("/grades-distribution")
-def get_grades_distribution(
+async def get_grades_distribution(
     student_id: Optional[int] = None,
     subject_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    bucket_width: int = Query(5, ge=1, le=int(MAX_GRADE)),
+    by_subject: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get grades distribution by ranges."""
-    query = db.query(Grade)
+    """Get grades distribution by ranges.
+
+    Buckets are ``bucket_width`` points wide and counted in SQL; a grade of 20
+    falls in the last bucket. ``by_subject=true`` adds a per-subject breakdown
+    computed by the same query.
+    """
+    bucket_count = math.ceil(MAX_GRADE / bucket_width)
+    bucket = case(
+        (Grade.grade >= MAX_GRADE, bucket_count - 1),
+        else_=func.floor(Grade.grade / bucket_width)
+    ).label("bucket")
+    
+    columns = [bucket, func.count(Grade.id)]
+    if by_subject:
+        columns.insert(0, Grade.subject_id)
+    query = select(*columns).where(Grade.grade >= 0, Grade.grade <= MAX_GRADE)
     
     if current_user.role == UserRole.STUDENT:
-        query = query.filter(Grade.student_id == current_user.id)
+        query = query.where(Grade.student_id == current_user.id)
     elif student_id:
-        query = query.filter(Grade.student_id == student_id)
+        query = query.where(Grade.student_id == student_id)
     
     if subject_id:
-        query = query.filter(Grade.subject_id == subject_id)
+        query = query.where(Grade.subject_id == subject_id)
     
-    grades = query.all()
+    rows = (await db.execute(query.group_by(*columns[:-1]))).all()
     
-    distribution = {
-        "0-5": len([g for g in grades if 0 <= g.grade < 5]),
-        "5-10": len([g for g in grades if 5 <= g.grade < 10]),
-        "10-15": len([g for g in grades if 10 <= g.grade < 15]),
-        "15-20": len([g for g in grades if 15 <= g.grade <= 20])
-    }
+    labels = [
+        f"{_format_bound(i * bucket_width)}-{_format_bound(min((i + 1) * bucket_width, MAX_GRADE))}"
+        for i in range(bucket_count)
+    ]
+    distribution = dict.fromkeys(labels, 0)
+    if not by_subject:
+        for index, count in rows:
+            distribution[labels[int(index)]] += count
+        return distribution
+    
+    subjects = {}
+    for subject, index, count in rows:
+        per_subject = subjects.setdefault(subject, dict.fromkeys(labels, 0))
+        per_subject[labels[int(index)]] += count
+        distribution[labels[int(index)]] += count
     
-    return distribution
+    return {
+        "distribution": distribution,
+        "by_subject": [
+            {"subject_id": subject, "distribution": subjects[subject]}
+            for subject in sorted(subjects)
+        ],
+    }
+
 
+def _format_bound(value: float) -> str:
+    """Render a bucket bound without a trailing ``.0``."""
+    return f"{value:g}"
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
@@ -7,21 +7,36 @@ from app.models.subject import Subject
 from app.models.class_model import Class
 from app.schemas.subject import SubjectResponse, SubjectCreate, SubjectUpdate
 from app.core.security import get_current_user, require_role
+from app.core.serialization import list_response
+from app.core.table_versions import not_modified, versioned_etag
 
 router = APIRouter()
 
+# Subjects are set up per term; clients revalidate after five minutes
+CACHE_CONTROL = "private, max-age=300"
+
 
 @router.get("/", response_model=List[SubjectResponse])
 def get_subjects(
+    request: Request,
+    response: Response,
     class_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all subjects, optionally filtered by class."""
+    """Get all subjects, optionally filtered by class.
+
+    Served with a weak ``ETag`` over the subjects table version; a matching
+    ``If-None-Match`` gets ``304 Not Modified`` without a query.
+    """
+    etag = versioned_etag(request, ("subjects",), "all")
+    unchanged = not_modified(request, response, etag, CACHE_CONTROL)
+    if unchanged is not None:
+        return unchanged
     query = db.query(Subject)
     if class_id:
         query = query.filter(Subject.class_id == class_id)
-    return query.all()
+    return list_response(request, query.all(), SubjectResponse, response)
 
 
 @router.get("/{subject_id}", response_model=SubjectResponse)
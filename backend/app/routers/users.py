@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User, UserRole
 from app.schemas.user import UserResponse, UserCreate, UserUpdate
-from app.core.security import get_current_user, require_role, get_password_hash
+from app.core.security import (
+    get_current_user, require_role, get_password_hash_async, invalidate_cached_user
+)
+from app.core.serialization import list_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[UserResponse])
 def get_users(
+    request: Request,
     role: Optional[UserRole] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.TEACHER]))
@@ -19,7 +25,7 @@ def get_users(
     query = db.query(User)
     if role:
         query = query.filter(User.role == role)
-    return query.all()
+    return list_response(request, query.all(), UserResponse)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
@@ -41,37 +47,37 @@ def get_user(
 
 
 @router.post("/", response_model=UserResponse)
-def create_user(
+async def create_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """Create a new user (Admin only)."""
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     new_user = User(
         name=user_data.name,
         email=user_data.email,
-        password=get_password_hash(user_data.password),
+        password=await get_password_hash_async(user_data.password),
         role=user_data.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(require_role([UserRole.ADMIN]))
 ):
     """Update user (Admin only)."""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -80,12 +86,13 @@ def update_user(
     if user_data.email:
         user.email = user_data.email
     if user_data.password:
-        user.password = get_password_hash(user_data.password)
+        user.password = await get_password_hash_async(user_data.password)
     if user_data.role:
         user.role = user_data.role
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    invalidate_cached_user(user_id)
+    await db.refresh(user)
     return user
 
 
@@ -102,5 +109,6 @@ def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_cached_user(user_id)
     return {"message": "User deleted successfully"}
 
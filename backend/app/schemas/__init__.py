@@ -1,16 +1,18 @@
 from .user import UserCreate, UserResponse, UserUpdate, LoginRequest, TokenResponse, RefreshTokenRequest
 from .class_model import ClassCreate, ClassResponse, ClassUpdate
 from .subject import SubjectCreate, SubjectResponse, SubjectUpdate
-from .grade import GradeCreate, GradeResponse, GradeUpdate
+from .grade import GradeCreate, GradeResponse, GradeUpdate, GradeBulkCreate, GradeBulkError, GradeBulkResponse
 from .absence import AbsenceCreate, AbsenceResponse, AbsenceUpdate
 from .event import EventCreate, EventResponse, EventUpdate
+from .report import ReportBatchCreate, ReportBatchStatus
 
 __all__ = [
     "UserCreate", "UserResponse", "UserUpdate", "LoginRequest", "TokenResponse", "RefreshTokenRequest",
     "ClassCreate", "ClassResponse", "ClassUpdate",
     "SubjectCreate", "SubjectResponse", "SubjectUpdate",
-    "GradeCreate", "GradeResponse", "GradeUpdate",
+    "GradeCreate", "GradeResponse", "GradeUpdate", "GradeBulkCreate", "GradeBulkError", "GradeBulkResponse",
     "AbsenceCreate", "AbsenceResponse", "AbsenceUpdate",
-    "EventCreate", "EventResponse", "EventUpdate"
+    "EventCreate", "EventResponse", "EventUpdate",
+    "ReportBatchCreate", "ReportBatchStatus"
 ]
 
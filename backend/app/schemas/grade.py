@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 from datetime import datetime
 from app.schemas.user import UserResponse
 from app.schemas.subject import SubjectResponse
@@ -11,6 +11,21 @@ class GradeCreate(BaseModel):
     grade: float
 
 
+class GradeBulkCreate(BaseModel):
+    grades: List[GradeCreate] = Field(..., min_length=1, max_length=5000)
+    atomic: bool = False
+
+
+class GradeBulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class GradeBulkResponse(BaseModel):
+    created: int
+    errors: List[GradeBulkError]
+
+
 class GradeUpdate(BaseModel):
     student_id: Optional[int] = None
     subject_id: Optional[int] = None
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Literal, Optional, Union
+
+
+class ReportBatchCreate(BaseModel):
+    class_id: Union[int, Literal["all"]]
+    format: Literal["zip", "pdf"] = "zip"
+
+
+class ReportBatchStatus(BaseModel):
+    job_id: str
+    status: Literal["pending", "running", "completed", "failed"]
+    class_id: Union[int, Literal["all"]]
+    format: Literal["zip", "pdf"]
+    total: int
+    completed: int
+    error: Optional[str] = None
@@ -0,0 +1,114 @@
+"""
+Benchmark: serialization time of a 10k-grade list response
+
+Drives two FastAPI routes directly through ASGI (no sockets, no database)
+returning the same 10,000 ORM grades with their student and subject: one
+through ``response_model=List[GradeResponse]`` as FastAPI serializes it, one
+through ``list_response`` as JSON and as MessagePack.
+
+Run from the backend directory:
+    python -m benchmarks.list_serialization [grades] [rounds]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, Request
+
+from app.core.serialization import list_response
+from app.models import Grade, Subject, User, UserRole
+from app.schemas.grade import GradeResponse
+
+
+def make_grades(count: int) -> list:
+    """Grades of 30 students in 8 subjects, relations loaded, as a class would have"""
+    students = [
+        User(id=i, name=f"Student {i}", email=f"student{i}@school.test", password="x", role=UserRole.STUDENT)
+        for i in range(30)
+    ]
+    subjects = [Subject(id=i, name=f"Subject {i}", class_id=1) for i in range(8)]
+    return [
+        Grade(
+            id=i, student_id=i % 30, subject_id=i % 8, grade=10 + i % 10 * 0.5,
+            created_at=datetime(2024, 3, 4, 10, i % 60), student=students[i % 30], subject=subjects[i % 8],
+        )
+        for i in range(count)
+    ]
+
+
+def build_app(grades: list) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=List[GradeResponse])
+    def validated():
+        return grades
+
+    @app.get("/fast")
+    def fast(request: Request):
+        return list_response(request, grades, GradeResponse)
+
+    return app
+
+
+async def drive(app, path: str, accept: bytes, rounds: int) -> tuple:
+    """(seconds per response, body size) over ``rounds`` sequential ASGI requests"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench"), (b"accept", accept)],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+    size = 0
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    async def request():
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if delivered:
+                await asyncio.Event().wait()
+            delivered = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    await request()  # warm up
+    size = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await request()
+    return (time.perf_counter() - started) / rounds, size // rounds
+
+
+async def main(count: int, rounds: int):
+    app = build_app(make_grades(count))
+    print(f"{count} grades with student and subject, {rounds} rounds")
+    baseline = None
+    for name, path, accept in (
+        ("response_model (json)", "/validated", b"application/json"),
+        ("list_response (orjson)", "/fast", b"application/json"),
+        ("list_response (msgpack)", "/fast", b"application/msgpack"),
+    ):
+        per_response, size = await drive(app, path, accept, rounds)
+        baseline = baseline or per_response
+        print(
+            f"  {name:<26} {per_response * 1000:8.1f} ms/response  "
+            f"{size / 1024:8.1f} KiB  ({baseline / per_response:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    ))
@@ -0,0 +1,133 @@
+"""
+Microbenchmark: per-request overhead of MonitoringMiddleware
+
+Drives a minimal Starlette app directly through ASGI (no sockets, no HTTP
+parsing) so the numbers isolate the middleware itself. Compares no
+middleware, the previous BaseHTTPMiddleware implementation and the current
+pure ASGI one, for a plain JSON response and a streamed response.
+
+Run from the backend directory:
+    python -m benchmarks.monitoring_middleware [requests]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.core import monitoring
+from app.core.monitoring import MonitoringMiddleware, QueryStats, current_query_stats, metrics_store
+
+
+class BaseHTTPMonitoringMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware implementation this replaced, kept for comparison"""
+
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        query_stats = QueryStats()
+        stats_token = current_query_stats.set(query_stats)
+        monitoring.logger.info(f"→ {request.method} {request.url.path}")
+        try:
+            response = await call_next(request)
+            duration = time.time() - start_time
+            metrics_store.record_request(
+                monitoring._route_template(request.scope), duration, response.status_code, request.method
+            )
+            monitoring.logger.info(
+                f"← {request.method} {request.url.path} "
+                f"→ {response.status_code} ({duration*1000:.2f}ms)"
+            )
+            response.headers["X-Response-Time"] = f"{duration*1000:.2f}ms"
+            response.headers["X-Request-ID"] = str(id(request))
+            metrics_store.record_route_queries(monitoring._route_template(request.scope), query_stats)
+            response.headers["X-DB-Queries"] = str(query_stats.count)
+            response.headers["Server-Timing"] = (
+                f'db;dur={query_stats.duration*1000:.2f};desc="{query_stats.count} queries"'
+            )
+            return response
+        finally:
+            current_query_stats.reset(stats_token)
+
+
+async def plain(request):
+    return JSONResponse({"id": 1, "grade": 14.5})
+
+
+async def streamed(request):
+    async def lines():
+        for i in range(10):
+            yield b'{"id": %d}\n' % i
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def build_app(middleware_class=None):
+    app = Starlette(routes=[Route("/plain", plain), Route("/streamed", streamed)])
+    if middleware_class is not None:
+        app.add_middleware(middleware_class)
+    return app
+
+
+async def drive(app, path: str, requests: int) -> float:
+    """Seconds per request for ``requests`` sequential ASGI requests"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234), "server": ("bench", 80),
+    }
+
+    async def send(message):
+        pass
+
+    async def request():
+        # Like a server: the body once, then block until the client goes away
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if delivered:
+                await asyncio.Event().wait()
+            delivered = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(200):  # warm up
+        await request()
+    started = time.perf_counter()
+    for _ in range(requests):
+        await request()
+    return (time.perf_counter() - started) / requests
+
+
+async def main(requests: int):
+    # Request logging goes through the same INFO logger in both versions
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    variants = [
+        ("no middleware", build_app()),
+        ("BaseHTTPMiddleware", build_app(BaseHTTPMonitoringMiddleware)),
+        ("pure ASGI", build_app(MonitoringMiddleware)),
+    ]
+    for path in ("/plain", "/streamed"):
+        baseline = None
+        print(f"{path} ({requests} requests)")
+        for name, app in variants:
+            per_request = await drive(app, path, requests)
+            if baseline is None:
+                baseline = per_request
+                print(f"  {name:<20} {per_request * 1e6:8.1f} us/request")
+            else:
+                overhead = (per_request - baseline) * 1e6
+                print(f"  {name:<20} {per_request * 1e6:8.1f} us/request  (+{overhead:.1f} us)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,61 @@
+"""
+Gunicorn configuration (loaded automatically from the working directory)
+Worker count, class and bind address are passed on the command line (see Procfile)
+
+The app is preloaded in the master: the schema is verified once there, the
+heap is frozen so workers share it copy-on-write, and each worker drops the
+connection pools it inherited. Rate limit buckets are kept in a SQLite file
+all workers share.
+"""
+import gc
+import os
+import tempfile
+
+from app.core.config import settings
+from app.core.shared_metrics import clear_metrics_dir
+
+preload_app = True
+
+# Used when RATE_LIMIT_STORAGE is not set; removed again on exit
+_rate_limit_tempfile = None
+
+
+def on_starting(server):
+    """Verify the schema once and freeze the preloaded heap before forking."""
+    global _rate_limit_tempfile
+    from app.core.database import dispose_inherited_pools, ensure_schema
+    from app.core.rate_limit import SQLiteBucketStore, rate_limiter
+
+    if settings.metrics_multiproc_dir:
+        clear_metrics_dir(settings.metrics_multiproc_dir)
+    path = settings.rate_limit_storage
+    if not path:
+        path = _rate_limit_tempfile = os.path.join(tempfile.gettempdir(), f"rate_limits_{os.getpid()}.db")
+    rate_limiter.store = SQLiteBucketStore(path)
+    rate_limiter.clear()
+    # Workers open their own connection to the file
+    rate_limiter.store.close()
+    ensure_schema()
+    # The master keeps no connections open for its workers to inherit
+    dispose_inherited_pools()
+    # Objects allocated so far are never collected, so the collector does not
+    # touch (and un-share) their pages in the workers
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Never share a database connection with the master or a sibling worker."""
+    from app.core.database import dispose_inherited_pools
+
+    dispose_inherited_pools()
+
+
+def on_exit(server):
+    """Remove the temporary rate limit buckets."""
+    if _rate_limit_tempfile:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(_rate_limit_tempfile + suffix)
+            except FileNotFoundError:
+                pass
@@ -1,22 +1,37 @@
 """
 Test configuration and fixtures for PFC backend tests.
-Uses SQLite in-memory database for fast, isolated testing.
+Uses a SQLite file in this run's temporary directory, shared by the sync and
+async sessions, with its tables recreated for every test.
 """
 import pytest
 import sys
 from pathlib import Path
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app.main import app
-from app.core.database import Base, get_db
-from app.core.security import get_password_hash
+from app.core.config import settings
+from app.core import database
+from app.core.database import Base, get_db, get_async_db
+from app.core.monitoring import instrument_engine
+from app.core.system_metrics import system_metrics_sampler
+from app.core.refresh_tokens import refresh_token_purger, revoked_refresh_tokens
+from app.core.rate_limit import rate_limiter
+from app.core.security import get_password_hash, get_current_user, user_cache
+from app.core.table_versions import table_versions
+from app.core.scope import teacher_scope_cache
+from app.routers.statistics import dashboard_cache
+from app.core.report_cards import report_card_cache
+from app.routers.reports import batch_jobs
 from app.models.user import User, UserRole
+from app.models.class_model import Class
+from app.models.subject import Subject
 
 # Try to import RefreshToken, but don't fail if it doesn't exist
 try:
@@ -26,22 +41,51 @@ except ImportError:
     REFRESH_TOKEN_AVAILABLE = False
 
 
-# Test database URL (SQLite in-memory)
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
+# Tables are created per test on the test engine, not at app startup
+settings.schema_init = "skip"
+database.schema_verified = True
 
-# Create test engine with special configuration for SQLite
-test_engine = create_engine(
-    SQLALCHEMY_TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# Bound to the engines of this run's database by the test_engines fixture
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+TestingAsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+refresh_token_purger.session_factory = TestingSessionLocal
+batch_jobs.session_factory = TestingSessionLocal
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+@pytest.fixture(scope="session", autouse=True)
+def test_engines(tmp_path_factory):
+    """Sync and async engines on a SQLite file private to this test run.
+
+    A file rather than memory, so the async engine sees the same data.
+    """
+    path = tmp_path_factory.mktemp("db") / "pfc_backend_tests.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    # No pooling: each TestClient runs its own event loop
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    system_metrics_sampler.engine = engine
+    system_metrics_sampler.async_engine = async_engine
+    TestingSessionLocal.configure(bind=engine)
+    TestingAsyncSessionLocal.configure(bind=async_engine)
+    yield engine, async_engine
+    engine.dispose()
+    async_engine.sync_engine.dispose()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def table_versions_file(tmp_path_factory):
+    """Keep this run's table version tokens apart from other runs on the machine."""
+    table_versions.close()
+    table_versions.path = str(tmp_path_factory.mktemp("versions") / "table_versions.bin")
+    yield table_versions.path
+    table_versions.close()
 
 
 @pytest.fixture(scope="function")
-def db_session():
+def db_session(test_engines):
     """Create a fresh database session for each test."""
+    test_engine = test_engines[0]
     # Create all tables
     Base.metadata.create_all(bind=test_engine)
     
@@ -54,6 +98,14 @@ def db_session():
         session.close()
         # Drop all tables after test
         Base.metadata.drop_all(bind=test_engine)
+        # Ids are reused by the next test's fresh tables
+        teacher_scope_cache.invalidate()
+        dashboard_cache.clear()
+        user_cache.clear()
+        report_card_cache.clear()
+        revoked_refresh_tokens.clear()
+        # Every test comes from the same client address
+        rate_limiter.clear()
 
 
 @pytest.fixture(scope="function")
@@ -65,7 +117,12 @@ def client(db_session):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     with TestClient(app) as test_client:
         yield test_client
@@ -73,6 +130,12 @@ def client(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def async_test_engine(test_engines):
+    """The engine behind the sessions the overridden get_async_db yields."""
+    return test_engines[1]
+
+
 @pytest.fixture
 def test_admin_user(db_session):
     """Create a test admin user."""
@@ -118,6 +181,34 @@ def test_student_user(db_session):
     return user
 
 
+@pytest.fixture
+def test_class(db_session, test_teacher_user):
+    """Create a class taught by the test teacher."""
+    class_obj = Class(name="Class 10A", teacher_id=test_teacher_user.id)
+    db_session.add(class_obj)
+    db_session.commit()
+    db_session.refresh(class_obj)
+    return class_obj
+
+
+@pytest.fixture
+def test_subject(db_session, test_class):
+    """Create a subject in the test class."""
+    subject = Subject(name="Mathematics", class_id=test_class.id)
+    db_session.add(subject)
+    db_session.commit()
+    db_session.refresh(subject)
+    return subject
+
+
+@pytest.fixture
+def login_as(client):
+    """Authenticate requests as the given user without going through /auth/login."""
+    def _login_as(user):
+        app.dependency_overrides[get_current_user] = lambda: user
+    return _login_as
+
+
 @pytest.fixture
 def admin_token(client, test_admin_user):
     """Get authentication token for admin user."""
@@ -1,10 +1,24 @@
 """
 Tests for authentication endpoints and JWT token management.
 """
+import inspect
 import pytest
 from fastapi import status
 import hashlib
 from datetime import datetime, timedelta
+from passlib.context import CryptContext
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.monitoring import metrics_store
+from app.core.refresh_tokens import hash_refresh_token, is_known_revoked, purge_expired_refresh_tokens
+from app.core.table_versions import table_versions
+from app.core.security import (
+    create_access_token, user_cache,
+    get_password_hash_async, verify_and_update_password_async
+)
+from app.models.refresh_token import RefreshToken
+from app.models.user import UserRole
+from app.routers.auth import login
 
 # Try to import RefreshToken
 try:
@@ -246,3 +260,178 @@ def test_refresh_token_hash_storage(client, test_admin_user, db_session):
     assert db_token.user_id == test_admin_user.id
     assert db_token.revoked is False
     assert db_token.expires_at > datetime.utcnow()
+
+
+def _bearer(user):
+    """Build an Authorization header for a user without calling /auth/login."""
+    token = create_access_token(data={"sub": str(user.id), "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _login_admin(client):
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "admin@test.com", "password": "admin123"}
+    )
+    return response.json()["refresh_token"]
+
+
+@pytest.fixture
+def users_selects(db_session):
+    """Count SELECT statements that read the users table."""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _record)
+
+
+@pytest.mark.integration
+def test_current_user_cached_between_requests(client, test_student_user, users_selects):
+    """Test the users lookup runs once for repeated requests with one token."""
+    headers = _bearer(test_student_user)
+
+    assert client.get("/api/events/", headers=headers).status_code == status.HTTP_200_OK
+    assert client.get("/api/events/", headers=headers).status_code == status.HTTP_200_OK
+
+    assert len(users_selects) == 1
+    assert user_cache.get(test_student_user.id)[1]["role"] == UserRole.STUDENT
+
+
+@pytest.mark.integration
+def test_current_user_cache_checks_users_version(client, test_student_user, users_selects):
+    """Test a users write committed by another worker makes the cached entry stale."""
+    headers = _bearer(test_student_user)
+    client.get("/api/events/", headers=headers)
+
+    # Another worker's commit only bumps the shared token; this cache is untouched
+    table_versions.bump(["users"])
+    client.get("/api/events/", headers=headers)
+
+    assert len(users_selects) == 2
+
+
+@pytest.mark.integration
+def test_current_user_cache_invalidated_on_update(
+    client, login_as, test_admin_user, test_student_user
+):
+    """Test updating a user drops its cached authorization fields."""
+    client.get("/api/events/", headers=_bearer(test_student_user))
+    assert user_cache.get(test_student_user.id) is not None
+
+    login_as(test_admin_user)
+    response = client.put(f"/api/users/{test_student_user.id}", json={"role": "teacher"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert user_cache.get(test_student_user.id) is None
+
+
+@pytest.mark.integration
+def test_current_user_from_token_claims(client, monkeypatch, test_student_user, users_selects):
+    """Test trust-token-claims mode skips the users lookup entirely."""
+    monkeypatch.setattr(settings, "auth_trust_token_claims", True)
+
+    response = client.get("/api/statistics/dashboard", headers=_bearer(test_student_user))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert users_selects == []
+
+
+@pytest.mark.unit
+async def test_password_hashing_runs_in_pool():
+    """Test the async hashing API round-trips and records pool metrics."""
+    completed = metrics_store.password_hash_jobs
+
+    hashed = await get_password_hash_async("secret123")
+    verified, new_hash = await verify_and_update_password_async("secret123", hashed)
+
+    assert verified is True
+    assert new_hash is None
+    metrics = metrics_store.get_password_hash_metrics()
+    assert metrics["completed"] == completed + 2
+    assert metrics["in_flight"] == 0
+
+
+@pytest.mark.integration
+def test_login_hashes_in_pool_off_event_loop(client, test_admin_user):
+    """Test login runs on the event loop and hands bcrypt to the pool."""
+    completed = metrics_store.password_hash_jobs
+
+    response = client.post("/api/auth/login", json={"email": "admin@test.com", "password": "admin123"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert inspect.iscoroutinefunction(login)
+    assert metrics_store.password_hash_jobs == completed + 1
+
+
+@pytest.mark.unit
+async def test_password_rehashed_when_cost_changes():
+    """Test a hash made with a different bcrypt cost is upgraded on verify."""
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret123")
+
+    verified, new_hash = await verify_and_update_password_async("secret123", old_hash)
+
+    assert verified is True
+    assert new_hash is not None
+    assert new_hash.startswith(f"$2b${settings.bcrypt_rounds:02d}$")
+
+
+@pytest.mark.integration
+def test_reused_refresh_token_rejected_without_query(client, test_admin_user, db_session):
+    """Test a refresh token this worker revoked is refused before any lookup."""
+    refresh_token = _login_admin(client)
+    client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+    assert is_known_revoked(hash_refresh_token(refresh_token))
+    response = client.post("/api/auth/refresh", json={"refresh_token": refresh_token})
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.headers["X-DB-Queries"] == "0"
+
+
+@pytest.mark.integration
+def test_logout_remembers_revoked_tokens(client, test_admin_user, db_session):
+    """Test logout adds the user's active refresh tokens to the revocation filter."""
+    refresh_tokens = [_login_admin(client), _login_admin(client)]
+
+    response = client.post("/api/auth/logout", headers=_bearer(test_admin_user))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert all(is_known_revoked(hash_refresh_token(token)) for token in refresh_tokens)
+
+
+@pytest.mark.unit
+def test_purge_deletes_expired_tokens_in_chunks(db_session, test_admin_user):
+    """Test the purge removes only expired rows, chunk by chunk."""
+    now = datetime.utcnow()
+    for i in range(5):
+        db_session.add(RefreshToken(
+            user_id=test_admin_user.id,
+            token_hash=hash_refresh_token(f"expired_{i}"),
+            expires_at=now - timedelta(days=1),
+            revoked=i % 2 == 0,
+        ))
+    db_session.add(RefreshToken(
+        user_id=test_admin_user.id,
+        token_hash=hash_refresh_token("active"),
+        expires_at=now + timedelta(days=1),
+    ))
+    db_session.commit()
+
+    commits = []
+    record_commit = commits.append
+    event.listen(db_session, "after_commit", record_commit)
+    try:
+        deleted = purge_expired_refresh_tokens(db_session, chunk_size=2, now=now)
+    finally:
+        event.remove(db_session, "after_commit", record_commit)
+
+    assert deleted == 5
+    assert len(commits) == 3
+    remaining = db_session.query(RefreshToken).all()
+    assert [token.token_hash for token in remaining] == [hash_refresh_token("active")]
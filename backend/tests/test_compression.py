@@ -0,0 +1,132 @@
+"""
+Tests for negotiated response compression.
+"""
+import gzip
+import zlib
+import pytest
+from datetime import date, timedelta
+from fastapi import status
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from app.core import compression
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.config import settings
+from app.models.event import Event
+
+ROWS = [{"id": i, "subject": {"id": 1, "name": "Mathematics"}, "grade": 14.5} for i in range(200)]
+
+
+def _app():
+    async def rows(request):
+        return JSONResponse(ROWS, headers={"ETag": '"abc"'})
+
+    async def small(request):
+        return JSONResponse({"ok": True})
+
+    async def pdf(request):
+        return Response(b"%PDF-1.4" + b"0" * 4096, media_type="application/pdf")
+
+    async def streamed(request):
+        async def lines():
+            for i in range(50):
+                yield b'{"id": %d, "name": "Mathematics"}\n' % i
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[
+        Route("/rows", rows), Route("/small", small), Route("/pdf", pdf), Route("/streamed", streamed),
+    ])
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+@pytest.fixture
+def raw_client():
+    """Client that leaves response bodies compressed, to inspect the wire bytes."""
+    with TestClient(_app()) as client:
+        yield client
+
+
+def _get_raw(client, path, accept_encoding="gzip"):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.unit
+def test_negotiate_encoding(monkeypatch):
+    """Test q-values, wildcards and refusals pick the right coding."""
+    monkeypatch.setattr(compression, "_brotli", lambda: None)
+
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("*") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("") is None
+
+
+@pytest.mark.unit
+def test_large_json_compressed(raw_client):
+    """Test a body over the threshold is gzipped with a weakened ETag."""
+    response, body = _get_raw(raw_client, "/rows")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert int(response.headers["content-length"]) == len(body)
+    assert gzip.decompress(body) == JSONResponse(ROWS).body
+
+
+@pytest.mark.unit
+def test_small_and_excluded_bodies_sent_as_is(raw_client):
+    """Test tiny bodies, PDFs and clients without gzip get identity responses."""
+    for path, accept_encoding in (("/small", "gzip"), ("/pdf", "gzip"), ("/rows", "identity")):
+        response, _ = _get_raw(raw_client, path, accept_encoding)
+        assert "content-encoding" not in response.headers, path
+
+
+@pytest.mark.unit
+def test_streamed_body_compressed_chunk_by_chunk(raw_client):
+    """Test a streamed body is compressed incrementally into one gzip stream."""
+    response, body = _get_raw(raw_client, "/streamed")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = zlib.decompress(body, 16 + zlib.MAX_WBITS).splitlines()
+    assert len(lines) == 50
+
+
+@pytest.mark.unit
+def test_large_body_compressed_in_threadpool(raw_client, monkeypatch):
+    """Test bodies over the thread threshold are compressed off the event loop."""
+    offloaded = []
+    real_run_in_threadpool = compression.run_in_threadpool
+
+    async def record(function, *args):
+        offloaded.append(function)
+        return await real_run_in_threadpool(function, *args)
+
+    monkeypatch.setattr(compression, "run_in_threadpool", record)
+    monkeypatch.setattr(settings, "compression_thread_threshold", 1024)
+
+    response, body = _get_raw(raw_client, "/rows")
+
+    assert offloaded == [compression.compress_body]
+    assert gzip.decompress(body) == JSONResponse(ROWS).body
+
+
+@pytest.mark.integration
+def test_event_list_compressed(client, login_as, db_session, test_student_user):
+    """Test the API's list endpoints are served gzipped to clients that accept it."""
+    db_session.add_all([
+        Event(title=f"Parent meeting {i}", date=date(2024, 1, 1) + timedelta(days=i), description="Room 12")
+        for i in range(50)
+    ])
+    db_session.commit()
+    login_as(test_student_user)
+
+    response = client.get("/api/events/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 50
@@ -0,0 +1,244 @@
+"""
+Tests for grade endpoints.
+"""
+import json
+import orjson
+import pytest
+from fastapi import status
+from app.core.config import settings
+from app.core.database import to_async_url
+from app.core.query_options import RelationIncludes
+from app.core.serialization import dump_list, list_adapter
+from app.core.scope import teacher_scope_cache
+from app.models.grade import Grade
+from app.schemas.grade import GradeResponse
+
+
+@pytest.fixture
+def many_grades(db_session, test_student_user, test_subject):
+    """Create a batch of grades for the test student."""
+    grades = [
+        Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=i % 21)
+        for i in range(25)
+    ]
+    db_session.add_all(grades)
+    db_session.commit()
+    return grades
+
+
+@pytest.mark.integration
+def test_get_grades_unpaginated_returns_all(client, login_as, test_admin_user, many_grades):
+    """Test the default list still returns every grade without a cursor header."""
+    login_as(test_admin_user)
+    response = client.get("/api/grades/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 25
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.integration
+def test_get_grades_keyset_pagination(client, login_as, test_admin_user, many_grades):
+    """Test walking all pages with the opaque cursor visits every grade once."""
+    login_as(test_admin_user)
+    seen = []
+    cursor = None
+
+    while True:
+        params = {"limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/grades/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend(g["id"] for g in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == sorted(g.id for g in many_grades)
+
+
+@pytest.mark.integration
+def test_get_grades_after_id(client, login_as, test_admin_user, many_grades):
+    """Test after_id returns only grades with a greater id."""
+    login_as(test_admin_user)
+    pivot = many_grades[19].id
+    response = client.get("/api/grades/", params={"after_id": pivot})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [g["id"] for g in response.json()] == [g.id for g in many_grades[20:]]
+
+
+@pytest.mark.integration
+def test_get_grades_invalid_cursor(client, login_as, test_admin_user):
+    """Test a tampered cursor is rejected."""
+    login_as(test_admin_user)
+    response = client.get("/api/grades/", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.integration
+def test_get_grades_ndjson_stream(client, login_as, test_student_user, many_grades):
+    """Test NDJSON streaming yields one flat grade per line."""
+    login_as(test_student_user)
+    response = client.get("/api/grades/", params={"stream": "ndjson"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 25
+    assert rows[0]["student_id"] == test_student_user.id
+    assert rows[0]["subject"] is None
+
+
+@pytest.mark.integration
+def test_create_grades_bulk_reports_row_errors(
+    client, login_as, db_session, test_teacher_user, test_student_user, test_subject
+):
+    """Test valid rows are inserted and invalid rows are reported by index."""
+    login_as(test_teacher_user)
+    response = client.post("/api/grades/bulk", json={"grades": [
+        {"student_id": test_student_user.id, "subject_id": test_subject.id, "grade": 15},
+        {"student_id": test_teacher_user.id, "subject_id": test_subject.id, "grade": 12},
+        {"student_id": test_student_user.id, "subject_id": 9999, "grade": 12},
+        {"student_id": test_student_user.id, "subject_id": test_subject.id, "grade": 21},
+        {"student_id": test_student_user.id, "subject_id": test_subject.id, "grade": 8.5},
+    ]})
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["created"] == 2
+    assert [(e["index"], e["detail"]) for e in data["errors"]] == [
+        (1, "Student not found"),
+        (2, "Subject not found"),
+        (3, "Grade must be between 0 and 20"),
+    ]
+    assert sorted(g.grade for g in db_session.query(Grade).all()) == [8.5, 15]
+
+
+@pytest.mark.integration
+def test_create_grades_bulk_atomic_rejects_batch(
+    client, login_as, db_session, test_teacher_user, test_student_user, test_subject
+):
+    """Test atomic mode inserts nothing when any row is invalid."""
+    login_as(test_teacher_user)
+    response = client.post("/api/grades/bulk", json={"atomic": True, "grades": [
+        {"student_id": test_student_user.id, "subject_id": test_subject.id, "grade": 15},
+        {"student_id": test_student_user.id, "subject_id": test_subject.id, "grade": -1},
+    ]})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == [{"index": 1, "detail": "Grade must be between 0 and 20"}]
+    assert db_session.query(Grade).count() == 0
+
+
+@pytest.mark.integration
+def test_create_grades_bulk_invalidates_teacher_scope(
+    client, login_as, test_teacher_user, test_student_user, test_subject
+):
+    """Test bulk inserts drop the cached teacher scope."""
+    login_as(test_teacher_user)
+    assert client.get("/api/absences/").json() == []
+    assert teacher_scope_cache.get(test_teacher_user.id) is not None
+
+    client.post("/api/grades/bulk", json={"grades": [
+        {"student_id": test_student_user.id, "subject_id": test_subject.id, "grade": 10},
+    ]})
+
+    assert teacher_scope_cache.get(test_teacher_user.id) is None
+
+
+@pytest.mark.integration
+def test_get_grade_includes_nested_relations(client, login_as, test_admin_user, many_grades):
+    """Test the async read path eager-loads the nested student and subject."""
+    login_as(test_admin_user)
+    response = client.get(f"/api/grades/{many_grades[0].id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["student"]["id"] == many_grades[0].student_id
+    assert data["subject"]["id"] == many_grades[0].subject_id
+
+
+@pytest.mark.unit
+def test_to_async_url_swaps_driver():
+    """Test sync database URLs map to their async drivers."""
+    assert to_async_url("mysql+pymysql://u:p@db/school").drivername == "mysql+aiomysql"
+    assert to_async_url("sqlite:////tmp/school.db").drivername == "sqlite+aiosqlite"
+    with pytest.raises(ValueError):
+        to_async_url("oracle://u:p@db/school")
+
+
+@pytest.mark.integration
+def test_get_grades_flat_by_default(client, login_as, test_admin_user, many_grades):
+    """Test the list leaves nested relations out unless they are included."""
+    login_as(test_admin_user)
+    grade = client.get("/api/grades/", params={"limit": 1}).json()[0]
+
+    assert grade["student"] is None
+    assert grade["subject"] is None
+
+
+@pytest.mark.integration
+def test_get_grades_include_relations(client, login_as, test_admin_user, test_student_user, many_grades):
+    """Test include= embeds only the requested relations."""
+    login_as(test_admin_user)
+    grades = client.get("/api/grades/", params={"include": "student"}).json()
+
+    assert len(grades) == 25
+    assert grades[0]["student"]["id"] == test_student_user.id
+    assert grades[0]["subject"] is None
+
+    both = client.get("/api/grades/", params={"include": "student,subject", "limit": 5}).json()
+    assert all(g["student"] and g["subject"] for g in both)
+
+
+@pytest.mark.integration
+def test_get_grades_unknown_include(client, login_as, test_admin_user):
+    """Test an unknown relation name is rejected."""
+    login_as(test_admin_user)
+    response = client.get("/api/grades/", params={"include": "teacher"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.unit
+def test_dump_list_matches_pydantic(db_session, many_grades):
+    """Test rows built from ORM state dump exactly as the response model would."""
+    grades = db_session.query(Grade).all()
+    for include in ("student,subject", "subject", None):
+        items = RelationIncludes(student=Grade.student, subject=Grade.subject).resolve(include).serializable(grades)
+        adapter = list_adapter(GradeResponse)
+        expected = adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+        assert orjson.loads(orjson.dumps(dump_list(items, GradeResponse))) == expected
+
+
+@pytest.mark.integration
+def test_get_grades_msgpack(client, login_as, test_admin_user, many_grades):
+    """Test Accept: application/msgpack returns the same rows as MessagePack."""
+    msgpack = pytest.importorskip("msgpack")
+    login_as(test_admin_user)
+    params = {"include": "student,subject", "limit": 10}
+
+    packed = client.get("/api/grades/", params=params, headers={"Accept": "application/msgpack"})
+    plain = client.get("/api/grades/", params=params)
+
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert "Accept" in packed.headers["vary"]
+    assert msgpack.unpackb(packed.content) == plain.json()
+    assert packed.headers["X-Next-Cursor"] == plain.headers["X-Next-Cursor"]
+
+
+@pytest.mark.integration
+def test_get_grades_same_without_fast_serialization(
+    client, login_as, monkeypatch, test_admin_user, many_grades
+):
+    """Test turning the fast path off serves the same JSON through FastAPI."""
+    login_as(test_admin_user)
+    fast = client.get("/api/grades/", params={"include": "subject"}).json()
+
+    monkeypatch.setattr(settings, "fast_list_serialization", False)
+    validated = client.get("/api/grades/", params={"include": "subject"}).json()
+
+    assert fast == validated
@@ -3,6 +3,11 @@ Tests for health check endpoints.
 """
 import pytest
 from fastapi import status
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+from app.core.config import settings
+from app.core.system_metrics import system_metrics_sampler
+from app.import_profile import profile
 
 
 @pytest.mark.unit
@@ -38,3 +43,91 @@ def test_health_check_database_connection(client):
     data = response.json()
     # With SQLite in-memory, connection should always succeed in tests
     assert data["database"] in ["connected", "disconnected"]
+
+
+@pytest.mark.integration
+def test_metrics_sampled_in_background(client):
+    """Test the sampler checks the database and /metrics serves its snapshot."""
+    snapshot = client.portal.call(system_metrics_sampler.sample)
+
+    assert snapshot["database"]["status"] == "connected"
+    assert set(snapshot["database"]["pools"]) == {"sync", "async"}
+
+    response = client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert data["sampled_at"] == system_metrics_sampler.snapshot["sampled_at"]
+    assert "total_requests" in data["application"]
+
+
+@pytest.mark.unit
+def test_metrics_health_reports_snapshot(client, monkeypatch):
+    """Test /metrics/health answers from the snapshot without querying."""
+    monkeypatch.setattr(system_metrics_sampler, "snapshot", {
+        "sampled_at": None,
+        "system": {},
+        "database": {"status": "disconnected", "error": "timed out", "latency_ms": None, "pools": {}},
+    })
+
+    data = client.get("/metrics/health").json()
+
+    assert data == {"status": "unhealthy", "database": "disconnected", "error": "timed out"}
+
+
+@pytest.mark.unit
+def test_liveness_probe(client):
+    """Test the liveness probe answers without touching the database."""
+    response = client.get("/health/live")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "alive"}
+
+
+@pytest.mark.integration
+def test_readiness_probe_after_warm_up(client):
+    """Test the worker is ready once startup warmed the pools up."""
+    response = client.get("/health/ready")
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["status"] == "ready"
+    assert data["checks"]["warmed_up"] is True
+    assert data["checks"]["database"] == "connected"
+
+
+@pytest.mark.unit
+def test_readiness_probe_fails_before_warm_up(client, monkeypatch):
+    """Test a worker that has not warmed up is taken out of rotation."""
+    monkeypatch.setattr(system_metrics_sampler, "warmed_up", False)
+
+    response = client.get("/health/ready")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "not_ready"
+
+
+@pytest.mark.unit
+def test_readiness_probe_fails_when_pool_saturated(client, monkeypatch):
+    """Test readiness fails while a connection pool is (nearly) exhausted."""
+    monkeypatch.setattr(settings, "readiness_max_pool_usage", 0.5)
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    monkeypatch.setattr(system_metrics_sampler, "engine", engine)
+
+    with engine.connect():
+        response = client.get("/health/ready")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["checks"]["pools"]["sync"] == {"usage": 1.0, "saturated": True}
+
+
+@pytest.mark.slow
+def test_heavy_modules_imported_lazily():
+    """Test importing the app does not load ReportLab, psutil or passlib."""
+    entries, rss_kib = profile("app.main")
+
+    loaded = {name.split(".")[0] for name, _, _, _ in entries}
+    assert "app" in loaded
+    assert not loaded & {"reportlab", "psutil", "passlib"}
+    assert rss_kib > 0
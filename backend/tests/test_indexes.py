@@ -0,0 +1,70 @@
+"""
+Tests that the role-filtered list endpoints read through indexes.
+"""
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from fastapi import status
+from app.core.index_check import explain_full_scans, find_full_scans, record_statements
+from app.models.absence import Absence
+from app.models.event import Event
+from app.models.grade import Grade
+
+
+@pytest.fixture
+def school_data(db_session, test_student_user, test_subject):
+    """Add a grade, an absence and an event for the test student."""
+    db_session.add_all([
+        Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=14),
+        Absence(student_id=test_student_user.id, date=date(2024, 3, 4), reason="Sick"),
+        Event(title="Exam", date=date(2024, 6, 1)),
+    ])
+    db_session.commit()
+
+
+def _full_scans(client, db_session, engine, paths):
+    with record_statements(engine.sync_engine) as statements:
+        for path in paths:
+            assert client.get(path).status_code == status.HTTP_200_OK
+    assert statements
+    # Same database file, explained through the synchronous engine
+    return find_full_scans(db_session.get_bind(), statements)
+
+
+@pytest.mark.unit
+def test_explain_reports_unindexed_filter(db_session):
+    """Test a filter on an unindexed column is reported as a full scan."""
+    with db_session.get_bind().connect() as conn:
+        assert explain_full_scans(conn, "SELECT * FROM absences WHERE reason = ?", ("Sick",)) == ["absences"]
+        assert explain_full_scans(conn, "SELECT * FROM absences WHERE student_id = ?", (1,)) == []
+
+
+@pytest.mark.unit
+def test_explain_rejects_unsupported_dialect():
+    """Test an unknown dialect is an error, not a silent pass."""
+    conn = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    with pytest.raises(ValueError, match="supported: sqlite, mysql, mariadb"):
+        explain_full_scans(conn, "SELECT * FROM absences")
+
+
+@pytest.mark.integration
+def test_student_lists_use_indexes(client, login_as, db_session, async_test_engine, school_data, test_student_user):
+    """Test a student's grades and absences are found through indexes."""
+    login_as(test_student_user)
+
+    assert _full_scans(client, db_session, async_test_engine, ["/api/grades/", "/api/absences/"]) == []
+
+
+@pytest.mark.integration
+def test_teacher_lists_use_indexes(client, login_as, db_session, async_test_engine, school_data, test_teacher_user, test_subject):
+    """Test a teacher's scoped lists are found through indexes."""
+    login_as(test_teacher_user)
+
+    scans = _full_scans(client, db_session, async_test_engine, [
+        "/api/grades/",
+        f"/api/grades/?subject_id={test_subject.id}",
+        "/api/absences/",
+        "/api/events/?start_date=2024-01-01&end_date=2024-12-31",
+    ])
+    assert scans == []
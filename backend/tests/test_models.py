@@ -3,6 +3,8 @@ Tests for SQLAlchemy models and their relationships.
 """
 import pytest
 from datetime import datetime, timedelta
+from app.core import database
+from app.models.event import Event
 from app.models.user import User, UserRole
 from app.core.security import get_password_hash
 import hashlib
@@ -277,3 +279,18 @@ def test_refresh_token_expiration_check(db_session, test_admin_user):
     # Check expiration
     assert expired_token.expires_at < datetime.utcnow()
     assert valid_token.expires_at > datetime.utcnow()
+
+
+@pytest.mark.unit
+def test_schema_skip_requires_existing_tables(db_session, monkeypatch):
+    """Test SCHEMA_INIT=skip starts on a full schema and refuses a missing table."""
+    engine = db_session.get_bind()
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "schema_verified", False)
+
+    database.verify_schema()
+    assert database.schema_verified is True
+
+    Event.__table__.drop(engine)
+    with pytest.raises(RuntimeError, match="tables are missing: events"):
+        database.verify_schema()
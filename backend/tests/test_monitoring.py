@@ -0,0 +1,181 @@
+"""
+Tests for request monitoring and SQL query accounting.
+"""
+import logging
+import multiprocessing
+import pytest
+from fastapi import status
+from app.core.config import settings
+from app.core.monitoring import (
+    LatencyHistogram, MetricsStore, QueryBudgetExceeded, QueryStats, metrics_store
+)
+from app.core.shared_metrics import MmapMetricValues
+from app.models.grade import Grade
+
+
+@pytest.mark.unit
+def test_query_stats_repeated_statements():
+    """Test identical statement shapes past the threshold are reported."""
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT * FROM subjects WHERE id = ?", 0.001)
+    stats.record("SELECT * FROM grades", 0.002)
+
+    assert stats.count == 4
+    assert stats.repeated_statements(3) == {"SELECT * FROM subjects WHERE id = ?": 3}
+    assert stats.repeated_statements(4) == {}
+
+
+@pytest.mark.integration
+def test_query_headers_and_route_metrics(
+    client, login_as, db_session, test_admin_user, test_student_user, test_subject
+):
+    """Test responses carry query counts and routes aggregate by template."""
+    grade = Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=11)
+    db_session.add(grade)
+    db_session.commit()
+
+    login_as(test_admin_user)
+    response = client.get(f"/api/grades/{grade.id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert int(response.headers["X-DB-Queries"]) >= 1
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    route_stats = metrics_store.get_route_query_metrics(limit=100)["/api/grades/{grade_id}"]
+    assert route_stats["requests"] >= 1
+
+
+@pytest.mark.integration
+def test_request_logged_once_at_debug(client, login_as, caplog, test_admin_user):
+    """Test a request writes a single DEBUG line and nothing at INFO."""
+    login_as(test_admin_user)
+    with caplog.at_level(logging.DEBUG, logger="app.core.monitoring"):
+        client.get("/api/events/")
+
+    records = [r for r in caplog.records if r.name == "app.core.monitoring"]
+    assert len(records) == 1
+    assert records[0].levelno == logging.DEBUG
+    assert records[0].getMessage().startswith("GET /api/events/ → 200")
+
+
+@pytest.mark.integration
+def test_query_budget_strict_mode(client, login_as, monkeypatch, test_teacher_user):
+    """Test strict mode fails a request that exceeds the query budget."""
+    monkeypatch.setattr(settings, "sql_query_budget", 1)
+    monkeypatch.setattr(settings, "sql_query_budget_strict", True)
+    login_as(test_teacher_user)
+
+    # Resolving the teacher scope and listing absences takes two statements
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/api/absences/")
+
+    assert 'http_request_duration_seconds_count{route="/api/absences/",method="GET",status="5xx"} 1' in (
+        metrics_store.render_prometheus()
+    )
+
+
+@pytest.mark.integration
+def test_streamed_body_queries_counted(
+    client, login_as, db_session, test_admin_user, test_student_user, test_subject
+):
+    """Test statements run while streaming a body count towards the route."""
+    db_session.add_all([
+        Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=value)
+        for value in (9, 15)
+    ])
+    db_session.commit()
+    login_as(test_admin_user)
+    before = metrics_store.get_route_query_metrics(limit=100).get("/api/grades/", {})
+
+    response = client.get("/api/grades/", params={"stream": "ndjson"})
+
+    after = metrics_store.get_route_query_metrics(limit=100)["/api/grades/"]
+    queries = round(after["average_queries"] * after["requests"]) - round(
+        before.get("average_queries", 0) * before.get("requests", 0)
+    )
+    assert len(response.text.splitlines()) == 2
+    assert queries > int(response.headers["X-DB-Queries"])
+
+
+@pytest.mark.unit
+def test_latency_histogram_quantiles():
+    """Test observations land in fixed buckets and quantiles interpolate."""
+    histogram = LatencyHistogram()
+    for seconds in (0.003, 0.004, 0.02, 0.02, 3.0):
+        histogram.observe(seconds)
+
+    assert histogram.count == 5
+    assert dict(histogram.cumulative_counts())[0.005] == 2
+    assert dict(histogram.cumulative_counts())[float("inf")] == 5
+    assert 0.01 < histogram.quantile(0.5) <= 0.025
+    assert 2.5 < histogram.quantile(0.99) <= 5.0
+
+
+@pytest.mark.integration
+def test_prometheus_histograms_by_route_template(
+    client, login_as, db_session, test_admin_user, test_student_user, test_subject
+):
+    """Test latency histograms are keyed by route template, not raw path."""
+    grades = [
+        Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=value)
+        for value in (9, 15)
+    ]
+    db_session.add_all(grades)
+    db_session.commit()
+
+    login_as(test_admin_user)
+    for grade in grades:
+        client.get(f"/api/grades/{grade.id}")
+    response = client.get("/metrics/prometheus")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    labels = 'route="/api/grades/{grade_id}",method="GET",status="2xx"'
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}' in body
+    assert f"/api/grades/{grades[0].id}" not in body
+    assert "GET /api/grades/{grade_id}" in metrics_store.get_route_latency_metrics(limit=100)
+
+
+def _worker_requests(store, count):
+    for _ in range(count):
+        store.record_request("/api/grades/", 0.03, 200, "GET")
+    store.record_password_hash_submitted()
+
+
+@pytest.mark.unit
+def test_shared_metrics_aggregate_workers(tmp_path):
+    """Test forked workers' metrics are summed and outlive the worker."""
+    store = MetricsStore(MmapMetricValues(str(tmp_path)))
+    store.record_request("/api/grades/", 0.02, 200, "GET")
+
+    worker = multiprocessing.get_context("fork").Process(target=_worker_requests, args=(store, 2))
+    worker.start()
+    worker.join()
+
+    assert len(list(tmp_path.glob("metrics_*.db"))) == 2
+    metrics = store.get_metrics()
+    assert metrics["total_requests"] == 3
+    assert metrics["endpoint_counts"] == {"/api/grades/": 3}
+    assert metrics["latency"]["GET /api/grades/"]["requests"] == 3
+    # The exited worker's in-flight gauge no longer counts
+    assert metrics["password_hashing"]["in_flight"] == 0
+
+
+@pytest.mark.integration
+def test_streamed_response_monitored(
+    client, login_as, db_session, test_admin_user, test_student_user, test_subject
+):
+    """Test streamed bodies pass through with headers and unique request ids."""
+    db_session.add(Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=12))
+    db_session.commit()
+    login_as(test_admin_user)
+
+    first = client.get("/api/grades/?stream=ndjson")
+    second = client.get("/api/grades/?stream=ndjson")
+
+    assert first.status_code == status.HTTP_200_OK
+    assert len(first.text.splitlines()) == 1
+    assert "X-DB-Queries" in first.headers
+    assert first.headers["X-Request-ID"] != second.headers["X-Request-ID"]
+    assert len(first.headers["X-Request-ID"]) == 32
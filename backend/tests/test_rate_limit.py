@@ -0,0 +1,159 @@
+"""
+Tests for the token-bucket rate limiter and its per-user keys.
+"""
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter, SQLiteBucketStore, client_key, parse_rate_limit
+from app.core.security import create_access_token
+from app.main import app
+
+
+def _bearer(user):
+    token = create_access_token(data={"sub": str(user.id), "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _client_from(address):
+    """A client whose requests come from ``address`` instead of the test client's."""
+    async def with_address(scope, receive, send):
+        await app(dict(scope, client=(address, 50000)), receive, send)
+    return TestClient(with_address)
+
+
+@pytest.mark.unit
+def test_parse_rate_limit():
+    """Test limits parse into a capacity and refill period."""
+    limit = parse_rate_limit("100/minute")
+
+    assert (limit.capacity, limit.period) == (100, 60)
+    assert limit.text == "100 per 1 minute"
+    with pytest.raises(ValueError):
+        parse_rate_limit("often")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("lease_fraction", [0.1, 0.5])
+def test_workers_share_one_bucket(tmp_path, lease_fraction):
+    """Test limiters over one SQLite file never allow more than the bucket holds."""
+    path = str(tmp_path / "buckets.db")
+    workers = [RateLimiter(SQLiteBucketStore(path), lease_fraction=lease_fraction) for _ in range(4)]
+    limit = parse_rate_limit("20/minute")
+
+    allowed = sum(
+        not worker.hit("user:1", limit) for _ in range(20) for worker in workers
+    )
+
+    assert allowed == 20
+    retry_after = workers[0].hit("user:1", limit)
+    assert 0 < retry_after <= 3
+
+
+@pytest.mark.unit
+async def test_locked_store_fails_open_off_the_event_loop(tmp_path):
+    """Test a store locked by another worker is waited on in a thread, then bypassed."""
+    path = str(tmp_path / "buckets.db")
+    limiter = RateLimiter(SQLiteBucketStore(path, busy_timeout=0.05))
+    limit = parse_rate_limit("1/minute")
+    assert limiter.hit("user:1", limit) == 0
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    threads = []
+    real_take = limiter.store.take
+
+    def take(*args):
+        threads.append(threading.current_thread())
+        return real_take(*args)
+
+    limiter.store.take = take
+    try:
+        assert await limiter.hit_async("user:1", limit) == 0
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert await limiter.hit_async("user:1", limit) > 0
+
+
+@pytest.mark.integration
+def test_signed_in_users_behind_one_address_get_own_buckets(
+    client, monkeypatch, test_student_user, test_teacher_user
+):
+    """Test the default limit applies per user, not per shared address."""
+    monkeypatch.setattr(settings, "rate_limit_default", "2/minute")
+
+    for _ in range(2):
+        assert client.get("/api/events/", headers=_bearer(test_student_user)).status_code == status.HTTP_200_OK
+    limited = client.get("/api/events/", headers=_bearer(test_student_user))
+
+    assert limited.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert client.get("/api/events/", headers=_bearer(test_teacher_user)).status_code == status.HTTP_200_OK
+    # Probes are never limited
+    assert client.get("/health/live").status_code == status.HTTP_200_OK
+
+
+@pytest.mark.integration
+def test_login_limited_per_account(client, monkeypatch, test_admin_user):
+    """Test failed logins exhaust the account's bucket from any address, not others'."""
+    monkeypatch.setattr(settings, "rate_limit_login", "2/minute")
+    attempt = {"email": "admin@test.com", "password": "wrong"}
+
+    codes = [client.post("/api/auth/login", json=attempt).status_code for _ in range(2)]
+    elsewhere = _client_from("10.1.2.3").post("/api/auth/login", json=attempt)
+    other = client.post("/api/auth/login", json={"email": "nobody@test.com", "password": "wrong"})
+
+    assert codes == [status.HTTP_401_UNAUTHORIZED] * 2
+    assert elsewhere.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert other.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.integration
+def test_login_limited_per_address(client, monkeypatch):
+    """Test one address can not spray attempts across many accounts."""
+    monkeypatch.setattr(settings, "rate_limit_login_ip", "3/minute")
+
+    codes = [
+        client.post("/api/auth/login", json={"email": f"user{i}@test.com", "password": "wrong"}).status_code
+        for i in range(4)
+    ]
+
+    assert codes == [status.HTTP_401_UNAUTHORIZED] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS]
+
+
+@pytest.mark.integration
+def test_login_not_charged_to_default_bucket(client, monkeypatch):
+    """Test a class signing in from one address is not held to the anonymous default."""
+    monkeypatch.setattr(settings, "rate_limit_default", "2/minute")
+
+    attempts = [{"email": f"student{i}@test.com", "password": "wrong"} for i in range(5)]
+    codes = {client.post("/api/auth/login", json=attempt).status_code for attempt in attempts}
+
+    assert codes == {status.HTTP_401_UNAUTHORIZED}
+
+
+@pytest.mark.unit
+def test_token_subject_cached_until_token_expires(test_student_user, monkeypatch):
+    """Test an expired token stops keying as its user though its entry is cached."""
+    token = create_access_token(data={"sub": str(test_student_user.id)}, expires_delta=timedelta(seconds=30))
+    scope = {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("10.0.0.1", 1234)}
+    assert client_key(scope) == f"user:{test_student_user.id}"
+
+    # Past the token's exp, though the cache entry's own TTL has not run out
+    real_time = time.time
+    monkeypatch.setattr(time, "time", lambda: real_time() + 31)
+
+    def expired(*args, **kwargs):
+        raise ExpiredSignatureError("Signature has expired.")
+
+    monkeypatch.setattr(jwt, "decode", expired)
+
+    assert client_key(scope) == "ip:10.0.0.1"
@@ -0,0 +1,234 @@
+"""
+Tests for report card endpoints.
+"""
+import io
+import os
+import zipfile
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from fastapi import status
+from app.core.pdf_generator import ReportCardData, load_report_cards_data, render_report_cards
+from app.core import report_batch
+from app.core.report_cards import report_card_cache, report_card_renderer
+from app.models.absence import Absence
+from app.models.grade import Grade
+from app.models.user import User, UserRole
+from app.routers.reports import batch_jobs
+
+
+@pytest.fixture
+def report_cache_dir(tmp_path, monkeypatch):
+    """Point the report card disk cache at a temporary directory."""
+    monkeypatch.setattr(report_card_cache, "directory", tmp_path)
+    return tmp_path
+
+
+@pytest.mark.integration
+def test_report_card_rendered_and_cached(
+    client, login_as, test_student_user, test_subject, report_cache_dir
+):
+    """Test a card is rendered once, stored on disk and served with an ETag."""
+    login_as(test_student_user)
+    response = client.get(f"/api/reports/report-card/{test_student_user.id}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+    key = response.headers["ETag"].strip('"')
+    assert (report_cache_dir / f"{key}.pdf").read_bytes() == response.content
+
+    # A fresh memory cache still finds the disk copy
+    report_card_cache.clear()
+    assert report_card_cache.get(key) == response.content
+
+
+@pytest.mark.integration
+def test_report_card_conditional_get(
+    client, login_as, db_session, test_student_user, test_subject, report_cache_dir
+):
+    """Test an unchanged card returns 304 and a new grade changes the ETag."""
+    login_as(test_student_user)
+    url = f"/api/reports/report-card/{test_student_user.id}"
+    etag = client.get(url).headers["ETag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    db_session.add(Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=17))
+    db_session.commit()
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
+@pytest.mark.unit
+def test_report_card_key_includes_report_date():
+    """Test a card rendered on another day gets its own cache key."""
+    card = ReportCardData(1, "Student", "s@test.com", "2025-01-10", [("Math", 15.0, "2025-01-09")], [])
+
+    assert card._replace(report_date="2025-01-11").content_hash() != card.content_hash()
+    assert card._replace(grades=[]).content_hash() != card.content_hash()
+
+
+@pytest.mark.unit
+def test_report_card_disk_cache_bounded(report_cache_dir, monkeypatch):
+    """Test the least recently used files are removed past the limit every few writes."""
+    monkeypatch.setattr(report_card_cache, "max_disk_entries", 2)
+    monkeypatch.setattr(report_card_cache, "evict_every", 2)
+    monkeypatch.setattr(report_card_cache, "_writes", 0)
+    for age, key in enumerate(("c", "b", "a")):
+        report_card_cache.set(key, b"%PDF")
+        os.utime(report_cache_dir / f"{key}.pdf", (1000 - age, 1000 - age))
+    # The third write is not an eviction write
+    assert len(list(report_cache_dir.glob("*.pdf"))) == 3
+    report_card_cache.clear()
+    report_card_cache.get("a")
+
+    report_card_cache.set("d", b"%PDF")
+
+    assert sorted(path.stem for path in report_cache_dir.glob("*.pdf")) == ["a", "d"]
+
+
+@pytest.mark.integration
+def test_report_card_other_student_forbidden(client, login_as, test_student_user):
+    """Test students cannot download someone else's card."""
+    login_as(test_student_user)
+    response = client.get(f"/api/reports/report-card/{test_student_user.id + 1}")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch, report_cache_dir):
+    """Keep batch job files in a temporary directory."""
+    directory = tmp_path / "batches"
+    monkeypatch.setattr(batch_jobs, "directory", directory)
+    return directory
+
+
+@pytest.fixture
+def graded_students(db_session, test_subject):
+    """Create three students with a grade each in the test subject."""
+    students = [
+        User(email=f"s{i}@test.com", name=f"Student {i}", password="x", role=UserRole.STUDENT)
+        for i in range(3)
+    ]
+    db_session.add_all(students)
+    db_session.commit()
+    db_session.add_all([
+        Grade(student_id=student.id, subject_id=test_subject.id, grade=10 + i)
+        for i, student in enumerate(students)
+    ])
+    db_session.add(Absence(student_id=students[0].id, date=date(2025, 2, 3), reason="Sick"))
+    db_session.commit()
+    return students
+
+
+@pytest.mark.unit
+def test_load_report_cards_data_for_class(db_session, test_class, test_student_user, graded_students):
+    """Test the batch loader only includes students graded in the class."""
+    cards = load_report_cards_data(db_session, test_class.id)
+
+    assert [card.student_id for card in cards] == [s.id for s in graded_students]
+    assert cards[0].grades[0][:2] == ("Mathematics", 10)
+    assert cards[0].absences == [("2025-02-03", "Sick")]
+    assert len(load_report_cards_data(db_session)) == 4
+
+
+@pytest.mark.integration
+def test_report_card_batch_zip(client, login_as, test_teacher_user, test_class, graded_students, batch_dir):
+    """Test a class batch job completes and downloads as a ZIP of cards."""
+    login_as(test_teacher_user)
+    response = client.post("/api/reports/batch", json={"class_id": test_class.id})
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.json()["job_id"]
+    job = client.get(f"/api/reports/batch/{job_id}").json()
+    assert (job["status"], job["completed"], job["total"]) == ("completed", 3, 3)
+
+    download = client.get(f"/api/reports/batch/{job_id}/download")
+    assert download.status_code == status.HTTP_200_OK
+    with zipfile.ZipFile(io.BytesIO(download.content)) as archive:
+        assert sorted(archive.namelist()) == sorted(f"report_card_{s.id}.pdf" for s in graded_students)
+
+
+@pytest.mark.integration
+def test_report_card_batch_merged_pdf(client, login_as, test_admin_user, graded_students, batch_dir):
+    """Test an "all" batch can be merged into a single PDF."""
+    login_as(test_admin_user)
+    job_id = client.post("/api/reports/batch", json={"class_id": "all", "format": "pdf"}).json()["job_id"]
+
+    download = client.get(f"/api/reports/batch/{job_id}/download")
+
+    assert download.status_code == status.HTTP_200_OK
+    assert download.headers["content-type"] == "application/pdf"
+    assert download.content.startswith(b"%PDF")
+
+
+@pytest.mark.unit
+def test_merged_pdf_rendered_in_executor(tmp_path):
+    """Test the merged PDF is built by the given pool, not the calling thread."""
+    submitted = []
+
+    class RecordingExecutor(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(fn)
+            return super().submit(fn, *args, **kwargs)
+
+    cards = [ReportCardData(i, f"Student {i}", "s@test.com", "2025-01-10", [], []) for i in range(2)]
+    with RecordingExecutor(max_workers=1) as executor:
+        path = report_batch.run_report_card_batch(cards, tmp_path / "all.pdf", "pdf", executor=executor)
+
+    assert submitted == [render_report_cards]
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+@pytest.mark.integration
+def test_report_card_batch_teacher_needs_own_class(client, login_as, test_teacher_user, batch_dir):
+    """Test teachers cannot start a school-wide batch."""
+    login_as(test_teacher_user)
+    response = client.post("/api/reports/batch", json={"class_id": "all"})
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.unit
+def test_stale_batch_job_reads_back_failed(batch_dir, monkeypatch):
+    """Test a running job whose worker stopped heartbeating is reported failed."""
+    job = {
+        "job_id": "a" * 32, "owner_id": 1, "status": "running", "class_id": "all",
+        "format": "zip", "total": 10, "completed": 4, "error": None,
+    }
+    batch_jobs.save(job)
+    assert batch_jobs.load(job["job_id"])["status"] == "running"
+
+    monkeypatch.setattr(batch_jobs, "stale_after", -1)
+    job = batch_jobs.load(job["job_id"])
+
+    assert (job["status"], job["completed"]) == ("failed", 4)
+    assert "worker exited" in job["error"]
+    monkeypatch.setattr(batch_jobs, "stale_after", 120.0)
+    assert batch_jobs.load(job["job_id"])["status"] == "failed"
+
+
+@pytest.mark.integration
+def test_report_card_batch_uses_render_pool(
+    client, login_as, test_admin_user, graded_students, batch_dir, monkeypatch
+):
+    """Test batch jobs load their cards themselves and render in the shared pool."""
+    calls = []
+    real_run = report_batch.run_report_card_batch
+
+    def record(cards, output_path, **kwargs):
+        calls.append((len(cards), kwargs["executor"]))
+        return real_run(cards, output_path, **kwargs)
+
+    monkeypatch.setattr(report_batch, "run_report_card_batch", record)
+    login_as(test_admin_user)
+
+    response = client.post("/api/reports/batch", json={"class_id": "all"})
+
+    assert response.json()["total"] == 0
+    assert calls == [(3, report_card_renderer.executor)]
+    assert client.get(f"/api/reports/batch/{response.json()['job_id']}").json()["status"] == "completed"
@@ -0,0 +1,81 @@
+"""
+Tests for the teacher scope resolver and its cache.
+"""
+import pytest
+from datetime import date
+from fastapi import status
+from app.core.scope import resolve_teacher_scope, teacher_scope_cache
+from app.models.absence import Absence
+from app.models.grade import Grade
+from app.models.subject import Subject
+
+
+@pytest.mark.unit
+def test_resolve_teacher_scope(db_session, test_teacher_user, test_student_user, test_subject):
+    """Test the resolver returns class, subject and student ids from grades."""
+    db_session.add(Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=12))
+    db_session.commit()
+
+    scope = resolve_teacher_scope(db_session, test_teacher_user.id)
+
+    assert scope.class_ids == {test_subject.class_id}
+    assert scope.subject_ids == {test_subject.id}
+    assert scope.student_ids == {test_student_user.id}
+
+
+@pytest.mark.unit
+def test_resolve_teacher_scope_without_classes(db_session, test_teacher_user):
+    """Test a teacher with no classes gets an empty scope."""
+    scope = resolve_teacher_scope(db_session, test_teacher_user.id)
+
+    assert scope.class_ids == frozenset()
+    assert scope.subject_ids == frozenset()
+    assert scope.student_ids == frozenset()
+
+
+@pytest.mark.unit
+def test_teacher_scope_cached_until_write(db_session, test_teacher_user, test_class):
+    """Test cached scopes are reused and dropped when a subject is added."""
+    first = resolve_teacher_scope(db_session, test_teacher_user.id)
+    assert teacher_scope_cache.get(test_teacher_user.id) is first
+
+    db_session.add(Subject(name="Physics", class_id=test_class.id))
+    db_session.commit()
+
+    assert teacher_scope_cache.get(test_teacher_user.id) is None
+    assert len(resolve_teacher_scope(db_session, test_teacher_user.id).subject_ids) == 1
+
+
+@pytest.mark.unit
+def test_teacher_scope_kept_until_commit(db_session, test_teacher_user, test_class):
+    """Test a flushed write only invalidates once committed, and a rollback never does."""
+    first = resolve_teacher_scope(db_session, test_teacher_user.id)
+
+    db_session.add(Subject(name="Physics", class_id=test_class.id))
+    db_session.flush()
+    assert teacher_scope_cache.get(test_teacher_user.id) is first
+    db_session.rollback()
+    assert teacher_scope_cache.get(test_teacher_user.id) is first
+
+    db_session.add(Subject(name="Chemistry", class_id=test_class.id))
+    db_session.commit()
+    assert teacher_scope_cache.get(test_teacher_user.id) is None
+
+
+@pytest.mark.integration
+def test_teacher_absences_limited_to_scope(
+    client, login_as, db_session, test_teacher_user, test_student_user, test_subject
+):
+    """Test teachers only see absences of students graded in their subjects."""
+    db_session.add_all([
+        Absence(student_id=test_student_user.id, date=date(2025, 1, 10)),
+        Absence(student_id=test_teacher_user.id, date=date(2025, 1, 11)),
+    ])
+    db_session.add(Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=9))
+    db_session.commit()
+
+    login_as(test_teacher_user)
+    response = client.get("/api/absences/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [a["student_id"] for a in response.json()] == [test_student_user.id]
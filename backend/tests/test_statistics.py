@@ -0,0 +1,119 @@
+"""
+Tests for statistics endpoints.
+"""
+import pytest
+from fastapi import status
+from app.models.grade import Grade
+from app.models.subject import Subject
+from app.routers.statistics import ADMIN_DASHBOARD_KEY, dashboard_cache
+
+
+@pytest.mark.integration
+def test_admin_dashboard_counters(
+    client, login_as, db_session, test_admin_user, test_student_user, test_subject
+):
+    """Test the single-query admin dashboard reports every counter."""
+    db_session.add_all([
+        Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=10),
+        Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=14),
+    ])
+    db_session.commit()
+
+    login_as(test_admin_user)
+    response = client.get("/api/statistics/dashboard")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "total_users": 3,
+        "total_students": 1,
+        "total_teachers": 1,
+        "total_classes": 1,
+        "total_subjects": 1,
+        "total_grades": 2,
+        "average_grade": 12.0,
+        "total_absences": 0,
+    }
+    assert response.headers["Cache-Control"].startswith("private, max-age=")
+
+
+@pytest.mark.integration
+def test_admin_dashboard_conditional_get(client, login_as, test_admin_user):
+    """Test a matching If-None-Match returns 304 without a body."""
+    login_as(test_admin_user)
+    etag = client.get("/api/statistics/dashboard").headers["ETag"]
+
+    response = client.get("/api/statistics/dashboard", headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.integration
+def test_admin_dashboard_cache_invalidated_on_write(
+    client, login_as, db_session, test_admin_user, test_student_user, test_subject
+):
+    """Test the cached counters are dropped once a grade write commits."""
+    login_as(test_admin_user)
+    assert client.get("/api/statistics/dashboard").json()["total_grades"] == 0
+    assert dashboard_cache.get(ADMIN_DASHBOARD_KEY) is not None
+
+    db_session.add(Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=8))
+    db_session.flush()
+    assert dashboard_cache.get(ADMIN_DASHBOARD_KEY) is not None
+    db_session.commit()
+
+    assert dashboard_cache.get(ADMIN_DASHBOARD_KEY) is None
+    assert client.get("/api/statistics/dashboard").json()["total_grades"] == 1
+
+
+@pytest.fixture
+def spread_grades(db_session, test_student_user, test_subject):
+    """Create grades covering every default bucket, including the 20 edge."""
+    for value in (0, 4.5, 5, 9.99, 12, 15, 20):
+        db_session.add(Grade(student_id=test_student_user.id, subject_id=test_subject.id, grade=value))
+    db_session.commit()
+
+
+@pytest.mark.integration
+def test_grades_distribution_default_buckets(client, login_as, test_admin_user, spread_grades):
+    """Test the default four buckets are counted in SQL."""
+    login_as(test_admin_user)
+    response = client.get("/api/statistics/grades-distribution")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"0-5": 2, "5-10": 2, "10-15": 1, "15-20": 2}
+
+
+@pytest.mark.integration
+def test_grades_distribution_custom_width(client, login_as, test_admin_user, spread_grades):
+    """Test a 2-point histogram has ten buckets with 20 in the last one."""
+    login_as(test_admin_user)
+    response = client.get("/api/statistics/grades-distribution", params={"bucket_width": 2})
+
+    data = response.json()
+    assert len(data) == 10
+    assert data["0-2"] == 1
+    assert data["4-6"] == 2
+    assert data["18-20"] == 1
+    assert sum(data.values()) == 7
+
+
+@pytest.mark.integration
+def test_grades_distribution_by_subject(
+    client, login_as, db_session, test_admin_user, test_student_user, test_class, test_subject, spread_grades
+):
+    """Test the per-subject breakdown sums to the overall distribution."""
+    other = Subject(name="Physics", class_id=test_class.id)
+    db_session.add(other)
+    db_session.commit()
+    db_session.add(Grade(student_id=test_student_user.id, subject_id=other.id, grade=11))
+    db_session.commit()
+
+    login_as(test_admin_user)
+    response = client.get("/api/statistics/grades-distribution", params={"by_subject": True})
+
+    data = response.json()
+    assert data["distribution"] == {"0-5": 2, "5-10": 2, "10-15": 2, "15-20": 2}
+    assert [s["subject_id"] for s in data["by_subject"]] == [test_subject.id, other.id]
+    assert data["by_subject"][1]["distribution"] == {"0-5": 0, "5-10": 0, "10-15": 1, "15-20": 0}
@@ -0,0 +1,103 @@
+"""
+Tests for table version tokens and the conditional GETs built on them.
+"""
+import pytest
+from datetime import date
+from fastapi import status
+from sqlalchemy import update
+from app.core.table_versions import TableVersions, table_versions
+from app.models.event import Event
+from app.models.subject import Subject
+
+
+@pytest.mark.unit
+def test_commit_bumps_written_tables_only(db_session, test_class):
+    """Test a commit changes the tokens of the tables it wrote and no others."""
+    before = table_versions.get("subjects", "events")
+
+    db_session.add(Subject(name="History", class_id=test_class.id))
+    db_session.commit()
+
+    subjects, events = table_versions.get("subjects", "events").split("-")
+    assert subjects != before.split("-")[0]
+    assert events == before.split("-")[1]
+
+
+@pytest.mark.unit
+def test_rollback_and_bulk_update(db_session, test_subject):
+    """Test a rolled back flush keeps the token and a bulk UPDATE changes it."""
+    before = table_versions.get("subjects")
+
+    db_session.add(Subject(name="History", class_id=test_subject.class_id))
+    db_session.flush()
+    db_session.rollback()
+    assert table_versions.get("subjects") == before
+
+    db_session.execute(update(Subject).values(name="Algebra"))
+    db_session.commit()
+    assert table_versions.get("subjects") != before
+
+
+@pytest.mark.unit
+def test_tokens_shared_through_file(tmp_path):
+    """Test processes mapping one file see each other's bumps, and a fresh start resets them."""
+    path = str(tmp_path / "versions.bin")
+    first, second = TableVersions(path), TableVersions(path)
+    before = first.get("events")
+
+    # The second opener finds the file held and keeps its tokens
+    assert second.get("events") == before
+    second.bump(["events"])
+    bumped = first.get("events")
+    assert bumped == second.get("events") != before
+
+    first.close()
+    second.close()
+    restarted = TableVersions(path)
+    assert restarted.get("events") not in (before, bumped)
+    restarted.close()
+
+
+@pytest.mark.integration
+def test_conditional_get_skips_database(client, login_as, test_student_user, test_subject):
+    """Test a matching If-None-Match gets 304 without a query."""
+    login_as(test_student_user)
+    first = client.get("/api/subjects/")
+    etag = first.headers["ETag"]
+
+    response = client.get("/api/subjects/", headers={"If-None-Match": etag})
+
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, max-age=300"
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.headers["X-DB-Queries"] == "0"
+    assert response.content == b""
+
+
+@pytest.mark.integration
+def test_write_changes_etag(client, login_as, db_session, test_admin_user):
+    """Test an event written after the first read makes the next read a 200."""
+    login_as(test_admin_user)
+    etag = client.get("/api/events/").headers["ETag"]
+
+    db_session.add(Event(title="Open day", date=date(2024, 5, 4)))
+    db_session.commit()
+    response = client.get("/api/events/", headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert [event["title"] for event in response.json()] == ["Open day"]
+
+
+@pytest.mark.integration
+def test_class_etag_scoped_per_teacher(client, login_as, test_admin_user, test_teacher_user, test_class):
+    """Test a teacher's class list has its own ETag and query variants differ."""
+    login_as(test_admin_user)
+    admin = client.get("/api/classes/").headers["ETag"]
+    admin_with_teacher = client.get("/api/classes/?include=teacher").headers["ETag"]
+    login_as(test_teacher_user)
+    teacher = client.get("/api/classes/", headers={"If-None-Match": admin})
+
+    assert teacher.status_code == status.HTTP_200_OK
+    assert len({admin, admin_with_teacher, teacher.headers["ETag"]}) == 3